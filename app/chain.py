@@ -1,10 +1,11 @@
 #LangServe에서 Ollama 체인 생성
-from langchain_community.chat_models import ChatOllama
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
-# LLM 지정 (Ollama + 모델명)
-llm = ChatOllama(model="eeve-korean-10-8b:latest")
+from core.llm import get_chat_llm
+
+# LLM 지정 (model 설정의 Ollama 모델, 프로세스 공유 클라이언트)
+llm = get_chat_llm()
 
 # 프롬프트 템플릿
 prompt = ChatPromptTemplate.from_template(
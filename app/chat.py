@@ -1,8 +1,9 @@
-from langchain_community.chat_models import ChatOllama
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-llm = ChatOllama(model="eeve-korean-10-8b:latest")
+from core.llm import get_chat_llm
+
+llm = get_chat_llm()
 
 prompt = ChatPromptTemplate.from_messages(
     [
@@ -13,7 +13,13 @@ DEFAULT_SETTINGS = {
         "temperature": 0.7,
         "max_tokens": 2048,
         "top_p": 0.9,
-        "top_k": 40
+        "top_k": 40,
+        "stream": True,  # 토큰 단위 스트리밍 출력
+        # Ollama 연결 설정
+        "ollama_model": "eeve-korean-10-8b",
+        "base_url": "http://localhost:11434",
+        "keep_alive": "30m",  # 마지막 요청 후 모델을 메모리에 유지할 시간
+        "preload": True  # 앱/서버 시작 시 모델을 미리 로드
     },
     
     # 임베딩 설정
@@ -21,16 +27,50 @@ DEFAULT_SETTINGS = {
         "model_name": "BAAI/bge-m3",
         "device": "cpu",
         "normalize_embeddings": True,
-        "dimension": 1024
+        "dimension": 1024,
+        "batch_size": 32,  # embed_documents 한 번의 forward에 넣을 문장 수
+        # 실행 백엔드 (torch | onnx) - onnx는 첫 사용 시 onnx_dir에 모델을 내보냄
+        "backend": "torch",
+        "onnx_dir": "./models/bge-m3-onnx",
+        "onnx_quantize": False,  # int8 동적 양자화 (크기 약 1/4, 코사인 점수 소폭 변화)
+        "max_length": 512,  # onnx 백엔드 토큰 최대 길이
+        "warmup": True,  # 앱 시작(데이터셋 로드) 시 모델을 미리 로드
+        # 동시 질의 임베딩을 한 번의 배치 forward로 묶는 마이크로 배치
+        "micro_batching": True,
+        "max_batch_size": 32,
+        "max_wait_ms": 5.0  # 첫 요청 후 다른 요청을 기다리는 최대 시간 (지연시간 vs 처리량)
     },
     
     # 검색 설정
     "search": {
-        "default_top_k": 5,
+        "default_top_k": 4,  # hybrid 검색으로 상위 문서 품질이 높아져 LLM 컨텍스트를 축소
         "max_top_k": 20,
         "similarity_threshold": 0.7,
         "use_embeddings": True,
-        "fallback_to_text": True
+        "fallback_to_text": True,
+        # 검색 방식 (dense | lexical | hybrid)
+        "retrieval_mode": "hybrid",
+        "fusion": "rrf",  # rrf | weighted
+        "rrf_k": 60,
+        "dense_weight": 0.7,  # weighted 융합 시 임베딩 점수 비중
+        "candidate_pool": 20,  # hybrid 모드에서 각 검색기가 가져올 후보 수
+        # 질문의 신체 부위/목표/도구로 운동 부위·체력 요소·도구 컬럼을 필터링한 행 중에서만 검색
+        # 조건에 맞지 않는 문서는 유사도가 높아도 제외되므로 필터 없는 검색 대비 recall@k가 낮아짐
+        # (benchmark_retrieval.py exact+metadata 모드에서 약 0.6~0.7) - 기본값은 꺼짐
+        "metadata_filter": False,
+        "filter_min_candidates": 50,  # 필터 후 후보가 이보다 적으면 조건을 하나씩 풀고, 그래도 부족하면 필터 없이 검색
+        "filter_exact_max": 50000,  # FAISS 인덱스에서 후보가 이 수 이하면 원본 벡터로 직접 계산, 초과하면 IDSelector 검색 (pq는 초과분을 걸러냄)
+        # 벡터 인덱스 설정 (exact | flat | ivf | hnsw | sq8 | pq)
+        # exact/ivf는 mmap된 데이터를 워커 간 공유, flat/hnsw는 빌드 시 프로세스마다 사본 생성
+        # sq8/pq는 압축 코드로 후보를 뽑은 뒤 원본 벡터로 재정렬
+        "index_type": "exact",
+        "ivf_nlist": 256,
+        "ivf_nprobe": 16,  # 클수록 재현율↑ 지연시간↑
+        "hnsw_m": 32,
+        "hnsw_ef_construction": 200,
+        "hnsw_ef_search": 64,  # 클수록 재현율↑ 지연시간↑
+        "pq_m": 256,  # PQ 서브벡터 수 (= 벡터당 바이트 수)
+        "rerank_factor": 4  # 압축 인덱스에서 top_k × rerank_factor 후보를 원본 벡터로 재정렬
     },
     
     # UI 설정
@@ -48,6 +88,7 @@ DEFAULT_SETTINGS = {
         "text_csv": "text_ex.csv",
         "full_csv": "full_data_ex.csv",
         "embeddings_npy": "embeddings_ex.npy",
+        "mmap_embeddings": True,  # 임베딩을 mmap으로 로드해 워커 간 메모리 공유
         "cache_embeddings": True
     },
     
@@ -62,8 +103,15 @@ DEFAULT_SETTINGS = {
     "performance": {
         "enable_caching": True,
         "cache_ttl": 3600,  # 1시간
-        "max_concurrent_requests": 10,
-        "request_timeout": 30
+        "query_cache_size": 1024,  # 질의 임베딩 LRU 캐시 크기
+        "query_cache_dir": "./.cache/query_embeddings",  # 워커 간 공유 디스크 캐시 (빈 값이면 사용 안 함)
+        "answer_cache_threshold": 0.95,  # 응답 캐시 재사용에 필요한 질의 임베딩 코사인 유사도
+        "answer_cache_size": 512,
+        "max_concurrent_requests": 10,  # 동시에 실행할 LLM 요청 수 (나머지는 대기열)
+        "request_timeout": 30,  # LLM 요청이 슬롯을 잡을 수 있는 최대 시간 (초, 넘으면 슬롯 회수 후 중단) / Ollama 읽기 타임아웃
+        "max_queue_size": 50,  # 대기열이 가득 차면 즉시 대체 응답 (load shedding)
+        "queue_timeout": 10,  # 대기열에서 기다릴 최대 시간 (초)
+        "metrics_dir": "./.cache/metrics"  # 프로세스별 지연시간 스냅샷 위치 (/metrics와 대시보드가 합산)
     }
 }
 
@@ -85,13 +133,29 @@ class Settings:
         env_mappings = {
             "MODEL_TEMPERATURE": ("model", "temperature", float),
             "MODEL_MAX_TOKENS": ("model", "max_tokens", int),
+            "OLLAMA_BASE_URL": ("model", "base_url", str),
+            "OLLAMA_MODEL": ("model", "ollama_model", str),
+            "OLLAMA_KEEP_ALIVE": ("model", "keep_alive", str),
             "EMBEDDINGS_MODEL": ("embeddings", "model_name", str),
             "EMBEDDINGS_DEVICE": ("embeddings", "device", str),
+            "EMBEDDINGS_BACKEND": ("embeddings", "backend", str),
+            "EMBEDDINGS_MAX_BATCH_SIZE": ("embeddings", "max_batch_size", int),
+            "EMBEDDINGS_MAX_WAIT_MS": ("embeddings", "max_wait_ms", float),
             "SEARCH_TOP_K": ("search", "default_top_k", int),
             "SEARCH_THRESHOLD": ("search", "similarity_threshold", float),
+            "SEARCH_MODE": ("search", "retrieval_mode", str),
+            "SEARCH_INDEX_TYPE": ("search", "index_type", str),
+            "SEARCH_IVF_NPROBE": ("search", "ivf_nprobe", int),
+            "SEARCH_HNSW_EF_SEARCH": ("search", "hnsw_ef_search", int),
             "DATA_DIR": ("data", "data_dir", str),
             "LOG_LEVEL": ("logging", "level", str),
-            "CACHE_TTL": ("performance", "cache_ttl", int)
+            "CACHE_TTL": ("performance", "cache_ttl", int),
+            "QUERY_CACHE_SIZE": ("performance", "query_cache_size", int),
+            "QUERY_CACHE_DIR": ("performance", "query_cache_dir", str),
+            "MAX_CONCURRENT_REQUESTS": ("performance", "max_concurrent_requests", int),
+            "REQUEST_TIMEOUT": ("performance", "request_timeout", int),
+            "MAX_QUEUE_SIZE": ("performance", "max_queue_size", int),
+            "QUEUE_TIMEOUT": ("performance", "queue_timeout", float)
         }
         
         for env_var, (section, key, type_func) in env_mappings.items():
@@ -178,6 +242,18 @@ class Settings:
                 print("Error: Similarity threshold must be between 0 and 1")
                 return False
             
+            if self.get("search", "retrieval_mode", "hybrid") not in ("dense", "lexical", "hybrid"):
+                print("Error: Search retrieval_mode must be one of dense, lexical, hybrid")
+                return False
+            
+            if self.get("search", "index_type", "exact") not in ("exact", "flat", "ivf", "hnsw", "sq8", "pq"):
+                print("Error: Search index_type must be one of exact, flat, ivf, hnsw, sq8, pq")
+                return False
+            
+            if self.get("embeddings", "backend", "torch") not in ("torch", "onnx"):
+                print("Error: Embeddings backend must be one of torch, onnx")
+                return False
+            
             return True
             
         except Exception as e:
@@ -0,0 +1,117 @@
+"""
+LLM 응답 시맨틱 캐시 모듈
+
+같은 문서가 검색되고 같은 프롬프트 템플릿을 쓰는 질문 중에서 질의 임베딩이 충분히 비슷한
+이전 질문이 있으면, LLM을 다시 호출하지 않고 저장된 답변을 반환합니다.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, Sequence
+
+import numpy as np
+import streamlit as st
+
+from config.settings import settings
+
+
+class SemanticAnswerCache:
+    """(검색 문서 ID, 템플릿 버전)별로 질의 임베딩 유사도를 비교하는 응답 캐시"""
+
+    def __init__(self, ttl: float = 3600, similarity_threshold: float = 0.95, max_entries: int = 512):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        # (문서 ID 튜플, 템플릿 버전) -> [{'vector', 'answer', 'created_at'}, ...]
+        self._entries: Dict[tuple, list] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _evict_expired(self, now: float):
+        for key in list(self._entries):
+            alive = [entry for entry in self._entries[key] if now - entry['created_at'] < self.ttl]
+            self._size -= len(self._entries[key]) - len(alive)
+            if alive:
+                self._entries[key] = alive
+            else:
+                del self._entries[key]
+
+    def lookup(self, query_vector, doc_ids: Sequence[Hashable], template_version: str) -> Optional[str]:
+        """조건이 맞는 캐시 답변을 반환하는 함수 (없으면 None)"""
+        query_vector = self._normalize(query_vector)
+        key = (tuple(doc_ids), template_version)
+        now = time.time()
+
+        with self._lock:
+            best_answer, best_similarity = None, self.similarity_threshold
+            for entry in self._entries.get(key, []):
+                if now - entry['created_at'] >= self.ttl:
+                    continue
+                similarity = float(entry['vector'] @ query_vector)
+                if similarity >= best_similarity:
+                    best_answer, best_similarity = entry['answer'], similarity
+
+            self.stats["hits" if best_answer is not None else "misses"] += 1
+            return best_answer
+
+    def store(self, query_vector, doc_ids: Sequence[Hashable], template_version: str, answer: str):
+        """LLM 응답을 캐시에 저장하는 함수"""
+        key = (tuple(doc_ids), template_version)
+        now = time.time()
+
+        with self._lock:
+            if self._size >= self.max_entries:
+                self._evict_expired(now)
+            if self._size >= self.max_entries:
+                # 만료된 항목이 없으면 가장 오래된 항목부터 제거
+                oldest_key = min(self._entries, key=lambda k: self._entries[k][0]['created_at'])
+                self._entries[oldest_key].pop(0)
+                self._size -= 1
+                if not self._entries[oldest_key]:
+                    del self._entries[oldest_key]
+
+            self._entries.setdefault(key, []).append({
+                'vector': self._normalize(query_vector),
+                'answer': answer,
+                'created_at': now,
+            })
+            self._size += 1
+
+    def get_or_generate(self, query_vector, doc_ids: Sequence[Hashable], template_version: str,
+                        generate: Callable[[], str]) -> str:
+        """캐시 답변이 없을 때만 generate()로 LLM을 호출하는 함수 (질의 임베딩이 없으면 캐시 미사용)"""
+        if query_vector is None or self.max_entries <= 0:
+            return generate()
+
+        answer = self.lookup(query_vector, doc_ids, template_version)
+        if answer is None:
+            answer = generate()
+            self.store(query_vector, doc_ids, template_version, answer)
+        return answer
+
+    def get_stats(self) -> Dict[str, float]:
+        """적중/실패 횟수와 적중률을 반환하는 함수"""
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": self._size,
+                "hit_rate": self.stats["hits"] / total if total else 0.0,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def load_answer_cache() -> SemanticAnswerCache:
+    """모든 세션이 공유하는 응답 캐시를 생성하는 함수 (캐시됨)"""
+    performance_settings = settings.get_performance_settings()
+    return SemanticAnswerCache(
+        ttl=performance_settings.get("cache_ttl", 3600),
+        similarity_threshold=performance_settings.get("answer_cache_threshold", 0.95),
+        max_entries=performance_settings.get("answer_cache_size", 512) if performance_settings.get("enable_caching", True) else 0,
+    )
@@ -0,0 +1,114 @@
+"""
+질의 임베딩 캐시 모듈
+
+자주 반복되는 질의(빠른 질문 버튼 등)는 임베딩 모델을 다시 실행하지 않도록
+정규화된 질의 문자열 → 벡터를 프로세스 내 LRU와 선택적 디스크 계층에 저장합니다.
+디스크 계층은 여러 워커 프로세스가 같은 디렉터리를 공유할 수 있습니다.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """캐시 키로 사용할 수 있도록 질의를 정규화하는 함수 (유니코드 NFC, 소문자, 공백 정리)"""
+    query = unicodedata.normalize("NFC", query)
+    return _WHITESPACE_PATTERN.sub(" ", query).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """정규화된 질의 → 임베딩 벡터 캐시 (LRU + 디스크)"""
+
+    def __init__(self, max_size: int = 1024, cache_dir: Optional[str] = None, namespace: str = ""):
+        self.max_size = max_size
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        # 모델이 바뀌면 다른 키를 사용하도록 모델 이름을 네임스페이스로 포함
+        self.namespace = namespace
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _key(self, normalized_query: str) -> str:
+        return hashlib.sha1(f"{self.namespace}\0{normalized_query}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.npy"
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """캐시된 벡터를 반환하는 함수 (없으면 None)"""
+        key = self._key(normalize_query(query))
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return vector
+
+        if self.cache_dir is not None:
+            try:
+                vector = np.load(self._disk_path(key))
+            except (OSError, ValueError):
+                vector = None
+            if vector is not None:
+                self._remember(key, vector)
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                return vector
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, query: str, vector) -> np.ndarray:
+        """벡터를 캐시에 저장하는 함수"""
+        key = self._key(normalize_query(query))
+        vector = np.asarray(vector, dtype=np.float32)
+        self._remember(key, vector)
+
+        if self.cache_dir is not None:
+            path = self._disk_path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # 다른 워커가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+                tmp_path = path.with_name(f"{key}.{os.getpid()}.tmp.npy")
+                np.save(tmp_path, vector)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+        return vector
+
+    def get_or_compute(self, query: str, compute: Callable[[str], list]) -> np.ndarray:
+        """캐시에 없을 때만 compute(query)로 벡터를 계산하는 함수"""
+        vector = self.get(query)
+        if vector is None:
+            vector = self.put(query, compute(query))
+        return vector
+
+    def get_stats(self) -> Dict[str, float]:
+        """적중/실패 횟수와 적중률을 반환하는 함수"""
+        with self._lock:
+            hits = self.stats["hits"] + self.stats["disk_hits"]
+            total = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": len(self._memory),
+                "hit_rate": hits / total if total else 0.0,
+            }
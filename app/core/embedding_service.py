@@ -0,0 +1,227 @@
+"""
+임베딩 모델 공유 서비스 모듈
+
+bge-m3 모델은 로드에 수 초, 메모리 약 2GB가 들기 때문에 프로세스마다 한 번만 로드해
+검색기(retriever), 업로드 파일 임베딩(data_loader), 임베딩 생성 스크립트가 함께 사용합니다.
+모델 설정은 모두 Settings.get_embeddings_settings()에서 읽으며,
+embeddings.backend로 PyTorch(sentence-transformers)와 ONNX Runtime 중 실행 방식을 고릅니다.
+
+동시에 들어온 질의 임베딩 요청은 EmbeddingBatcher가 짧은 시간 창 안에서 모아
+한 번의 배치 forward로 처리합니다 (Streamlit 세션들은 같은 프로세스의 스레드).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from core.onnx_embedder import OnnxEmbeddings
+
+
+class EmbeddingService(Embeddings):
+    """지연 로드되는 스레드 안전 임베딩 모델 래퍼 (LangChain Embeddings 인터페이스 호환)"""
+
+    def __init__(self, model_name: str = "BAAI/bge-m3", device: str = "cpu",
+                 normalize_embeddings: bool = True, batch_size: int = 32, backend: str = "torch",
+                 onnx_dir: str = "./models/bge-m3-onnx", onnx_quantize: bool = False, max_length: int = 512):
+        self.model_name = model_name
+        self.device = device
+        self.normalize_embeddings = normalize_embeddings
+        self.batch_size = batch_size
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.onnx_quantize = onnx_quantize
+        self.max_length = max_length
+        self._model = None
+        self._load_lock = threading.Lock()
+        # 여러 세션이 동시에 forward를 돌리면 CPU 스레드가 과다 경합하므로 호출을 직렬화
+        self._encode_lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def namespace(self) -> str:
+        """캐시 키 네임스페이스 - int8 양자화 모델은 벡터가 조금 달라지므로 구분"""
+        if self.backend == "onnx" and self.onnx_quantize:
+            return f"{self.model_name}:onnx-int8"
+        return self.model_name
+
+    def _get_model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None and self.backend == "onnx":
+                    self._model = OnnxEmbeddings(
+                        model_name=self.model_name,
+                        model_dir=self.onnx_dir,
+                        quantize=self.onnx_quantize,
+                        normalize_embeddings=self.normalize_embeddings,
+                        batch_size=self.batch_size,
+                        max_length=self.max_length,
+                    )
+                elif self._model is None:
+                    self._model = HuggingFaceEmbeddings(
+                        model_name=self.model_name,
+                        model_kwargs={'device': self.device},
+                        encode_kwargs={
+                            'normalize_embeddings': self.normalize_embeddings,
+                            'batch_size': self.batch_size,
+                        }
+                    )
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """문서 목록을 batch_size 단위로 임베딩하는 함수"""
+        if not texts:
+            return []
+        model = self._get_model()
+        with self._encode_lock:
+            return model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """질의 하나를 임베딩하는 함수"""
+        model = self._get_model()
+        with self._encode_lock:
+            return model.embed_query(text)
+
+    def warmup(self):
+        """모델을 로드하고 한 번 실행해 첫 질의의 지연을 없애는 함수"""
+        self.embed_query("warmup")
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "backend": self.backend,
+            "device": self.device,
+            "normalize_embeddings": self.normalize_embeddings,
+            "batch_size": self.batch_size,
+            "loaded": self.is_loaded,
+        }
+
+
+class EmbeddingBatcher:
+    """동시 embed_query 호출을 모아 한 번의 embed_documents로 처리하는 마이크로 배치 스케줄러
+
+    첫 요청이 도착한 뒤 max_wait_ms 동안(또는 max_batch_size개가 찰 때까지) 요청을 모읍니다.
+    이전 배치를 계산하는 동안 쌓인 요청은 기다리지 않고 바로 다음 배치가 됩니다.
+    """
+
+    def __init__(self, service: EmbeddingService, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.service = service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "max_batch_size": 0}
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """질의를 큐에 넣고 임베딩 결과를 받을 Future를 반환하는 함수"""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        """질의 하나를 배치에 합류시켜 임베딩하는 함수 (결과가 나올 때까지 대기)"""
+        return self.submit(text).result()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # 같은 질의가 동시에 여러 번 들어오면 한 번만 계산
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = dict(zip(texts, self.service.embed_documents(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for text, future in batch:
+                    future.set_result(vectors[text])
+
+            with self._stats_lock:
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+
+    def get_stats(self) -> Dict[str, float]:
+        """처리한 요청/배치 수와 평균 배치 크기를 반환하는 함수"""
+        with self._stats_lock:
+            return {
+                **self.stats,
+                "queue_depth": self._queue.qsize(),
+                "avg_batch_size": self.stats["requests"] / self.stats["batches"] if self.stats["batches"] else 0.0,
+            }
+
+
+_service: Optional[EmbeddingService] = None
+_batcher: Optional[EmbeddingBatcher] = None
+_service_lock = threading.Lock()
+
+
+def create_embedding_service(backend: Optional[str] = None) -> EmbeddingService:
+    """embeddings 설정으로 새 임베딩 서비스를 만드는 함수 (backend를 지정하면 설정값 대신 사용)"""
+    embeddings_settings = settings.get_embeddings_settings()
+    return EmbeddingService(
+        model_name=embeddings_settings.get("model_name", "BAAI/bge-m3"),
+        device=embeddings_settings.get("device", "cpu"),
+        normalize_embeddings=embeddings_settings.get("normalize_embeddings", True),
+        batch_size=embeddings_settings.get("batch_size", 32),
+        backend=backend or embeddings_settings.get("backend", "torch"),
+        onnx_dir=embeddings_settings.get("onnx_dir", "./models/bge-m3-onnx"),
+        onnx_quantize=embeddings_settings.get("onnx_quantize", False),
+        max_length=embeddings_settings.get("max_length", 512),
+    )
+
+
+def get_embedding_service() -> EmbeddingService:
+    """프로세스 전체에서 공유하는 임베딩 서비스를 반환하는 함수 (모델은 첫 사용 시 로드)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = create_embedding_service()
+    return _service
+
+
+def get_embedding_batcher() -> Optional[EmbeddingBatcher]:
+    """프로세스 공유 질의 임베딩 배치 스케줄러를 반환하는 함수 (embeddings.micro_batching이 꺼져 있으면 None)"""
+    global _batcher
+    embeddings_settings = settings.get_embeddings_settings()
+    if not embeddings_settings.get("micro_batching", True):
+        return None
+    if _batcher is None:
+        service = get_embedding_service()
+        with _service_lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher(
+                    service,
+                    max_batch_size=embeddings_settings.get("max_batch_size", 32),
+                    max_wait_ms=embeddings_settings.get("max_wait_ms", 5.0),
+                )
+    return _batcher
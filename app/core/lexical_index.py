@@ -0,0 +1,105 @@
+"""
+키워드(어휘) 검색용 역색인 모듈
+
+데이터셋 로드 시 한 번 토큰화해 역색인(posting list)을 만들고, 질의 시에는
+질의 토큰의 posting list만 읽어 BM25 점수를 계산합니다.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+_HANGUL_PATTERN = re.compile(r"[가-힣]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """한국어는 음절 bigram, 영문/숫자는 단어 단위로 토큰화하는 함수
+
+    조사/어미가 붙은 어절('하체를', '운동을')도 '하체', '운동' bigram을 공유하므로
+    형태소 분석기 없이도 부분 일치 검색이 가능합니다.
+    """
+    if not isinstance(text, str):
+        return []
+
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        if _HANGUL_PATTERN.fullmatch(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """BM25 점수를 사용하는 역색인"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = 0
+        self.idf: Dict[str, float] = {}
+        # term -> (문서 번호 배열, idf가 곱해진 BM25 가중치 배열)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def build(self, documents: Iterable[str]):
+        """문서 목록으로 역색인을 빌드하는 함수"""
+        term_docs = defaultdict(list)
+        term_freqs = defaultdict(list)
+        doc_lengths = []
+
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_docs[term].append(doc_id)
+                term_freqs[term].append(tf)
+
+        self.n_docs = len(doc_lengths)
+        lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.n_docs and lengths.mean() > 0 else 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+
+        self.idf = {}
+        self.postings = {}
+        for term, doc_ids in term_docs.items():
+            ids = np.asarray(doc_ids, dtype=np.int32)
+            tf = np.asarray(term_freqs[term], dtype=np.float32)
+            df = len(ids)
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            self.idf[term] = idf
+            self.postings[term] = (ids, idf * tf * (self.k1 + 1) / (tf + length_norm[ids]))
+
+        return self
+
+    def search(self, query: str, top_k: int,
+               candidate_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(정규화된 BM25 점수, 문서 번호) 배열을 점수 내림차순으로 반환하는 함수
+
+        점수는 질의 토큰이 모두 최대로 일치할 때의 상한으로 나누어 0~1 범위로 맞춥니다.
+        candidate_ids를 주면 그 문서들 중에서만 고릅니다 (메타데이터 필터링).
+        """
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms or top_k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in terms:
+            ids, weights = self.postings[term]
+            scores[ids] += weights
+
+        if candidate_ids is None:
+            candidates = np.flatnonzero(scores)
+        else:
+            candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+            candidates = candidate_ids[scores[candidate_ids] > 0]
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        # 동점일 때는 문서 번호 순으로 정렬해 결과를 결정적으로 유지
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+
+        max_score = sum(self.idf[term] for term in terms) * (self.k1 + 1)
+        return scores[candidates] / max_score, candidates
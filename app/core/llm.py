@@ -0,0 +1,88 @@
+"""
+LLM 클라이언트 팩토리 모듈
+
+Ollama 클라이언트를 메시지마다 새로 만들지 않고 프로세스에서 한 번만 생성해 재사용합니다.
+모델 태그, 서버 주소, 생성 옵션은 Settings.get_model_settings()에서 읽으며,
+keep_alive로 모델을 메모리에 유지하고 시작 시 미리 로드(preload)해 첫 토큰 지연을 줄입니다.
+
+연결 재사용 범위: LangChain Ollama/ChatOllama는 호출마다 requests.post로 새 연결을 열고 세션을
+주입할 방법이 없으므로, 아래 keep-alive 세션은 preload 요청에만 쓰입니다.
+답변 생성에서 연결 풀을 재사용하는 경로는 API 서버 /rag의 공유 httpx.AsyncClient입니다.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from langchain_community.chat_models import ChatOllama
+from langchain_community.llms import Ollama
+
+from config.settings import settings
+
+_llm: Optional[Ollama] = None
+_chat_llm: Optional[ChatOllama] = None
+_lock = threading.Lock()
+# 모델 미리 로드 요청에만 쓰는 keep-alive HTTP 세션 (Ollama/ChatOllama 생성 호출은 사용하지 않음)
+_session = requests.Session()
+_preload_started = False
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    """Ollama/ChatOllama 공통 생성 인자"""
+    model_settings = settings.get_model_settings()
+    return {
+        "model": model_settings.get("ollama_model", "eeve-korean-10-8b"),
+        "base_url": model_settings.get("base_url", "http://localhost:11434"),
+        "temperature": model_settings.get("temperature", 0.7),
+        "top_p": model_settings.get("top_p", 0.9),
+        "top_k": model_settings.get("top_k", 40),
+        "num_predict": model_settings.get("max_tokens", 2048),
+        "keep_alive": model_settings.get("keep_alive", "30m"),
+        "timeout": int(settings.get("performance", "request_timeout", 30)),
+    }
+
+
+def get_llm() -> Ollama:
+    """프로세스 공유 Ollama(텍스트 완성) 클라이언트를 반환하는 함수"""
+    global _llm
+    if _llm is None:
+        with _lock:
+            if _llm is None:
+                _llm = Ollama(**_client_kwargs())
+    return _llm
+
+
+def get_chat_llm() -> ChatOllama:
+    """프로세스 공유 ChatOllama(대화) 클라이언트를 반환하는 함수 (LangServe 체인용)"""
+    global _chat_llm
+    if _chat_llm is None:
+        with _lock:
+            if _chat_llm is None:
+                _chat_llm = ChatOllama(**_client_kwargs())
+    return _chat_llm
+
+
+def preload_model() -> bool:
+    """빈 프롬프트로 /api/generate를 호출해 모델을 메모리에 올리는 함수 (성공 여부 반환)"""
+    kwargs = _client_kwargs()
+    try:
+        response = _session.post(
+            f"{kwargs['base_url'].rstrip('/')}/api/generate",
+            json={"model": kwargs["model"], "keep_alive": kwargs["keep_alive"]},
+            timeout=kwargs["timeout"],
+        )
+        return response.ok
+    except requests.RequestException:
+        return False
+
+
+def warmup_llm():
+    """프로세스당 한 번 백그라운드 스레드에서 모델을 미리 로드하는 함수 (model.preload가 꺼져 있으면 무시)"""
+    global _preload_started
+    if not settings.get("model", "preload", True):
+        return
+    with _lock:
+        if _preload_started:
+            return
+        _preload_started = True
+    threading.Thread(target=preload_model, name="ollama-preload", daemon=True).start()
@@ -0,0 +1,236 @@
+"""
+LLM 요청 스케줄러 모듈
+
+Ollama 동시 호출 수를 performance.max_concurrent_requests로 제한하고, 나머지 요청은
+우선순위 → 세션별 공정 분배 → 도착 순으로 대기시킵니다.
+대기열이 가득 찼거나 대기 시간이 performance.queue_timeout을 넘으면 즉시 거절(load shedding)해
+호출 측이 빠르게 대체 응답을 보여줄 수 있게 합니다.
+슬롯을 performance.request_timeout보다 오래 잡고 있는 요청은 슬롯을 회수해 다음 요청에 넘기고,
+호출 측은 slot()이 돌려준 티켓의 expired로 생성을 중단할 수 있습니다.
+
+Streamlit(스레드)과 API 서버(asyncio)에서 같은 스케줄러를 사용할 수 있습니다.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, List, Optional
+
+from config.settings import settings
+
+# 우선순위 (작을수록 먼저 처리)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+FALLBACK_RESPONSE = (
+    "⏳ 현재 요청이 많아 답변을 생성하지 못했습니다. 잠시 후 다시 질문해 주세요."
+)
+
+
+class LLMOverloadedError(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 요청이 거절되었을 때 발생하는 예외"""
+
+
+class LLMRequestTimeoutError(LLMOverloadedError):
+    """슬롯을 request_timeout보다 오래 사용해 회수된 요청을 중단할 때 발생하는 예외"""
+
+
+class _Ticket:
+    __slots__ = ("session_id", "priority", "seq", "enqueued_at", "granted", "released", "expired",
+                 "_event", "_wakers", "_timer")
+
+    def __init__(self, session_id: str, priority: int, seq: int):
+        self.session_id = session_id
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.released = False
+        # request_timeout이 지나 슬롯이 회수되었는지 (호출 측은 이 값을 보고 생성을 중단)
+        self.expired = False
+        self._event = threading.Event()
+        self._wakers: List[Callable[[], None]] = []
+        self._timer: Optional[threading.Timer] = None
+
+    def grant(self):
+        self.granted = True
+        self._event.set()
+        for waker in self._wakers:
+            waker()
+
+
+class LLMScheduler:
+    """동시 실행 상한, 우선순위/공정 분배 대기열, 부하 차단을 제공하는 LLM 요청 스케줄러"""
+
+    def __init__(self, max_concurrent: int = 10, max_queue_size: int = 50,
+                 queue_timeout: float = 10.0, request_timeout: float = 30.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self._lock = threading.Lock()
+        self._waiting: List[_Ticket] = []
+        self._active = 0
+        # 세션별 실행 중인 요청 수 (공정 분배 기준)
+        self._active_by_session: Dict[str, int] = defaultdict(int)
+        self._seq = itertools.count()
+        self._wait_times = deque(maxlen=1000)
+        self.stats = {"completed": 0, "shed": 0, "queue_timeouts": 0, "request_timeouts": 0, "max_queue_depth": 0}
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        # 우선순위가 같으면 실행 중인 요청이 적은 세션부터, 그다음 도착 순
+        if not self._waiting:
+            return None
+        return min(self._waiting, key=lambda t: (t.priority, self._active_by_session[t.session_id], t.seq))
+
+    def _dispatch(self):
+        """빈 슬롯만큼 대기 요청에 실행 권한을 주는 함수 (lock 보유 상태에서 호출)"""
+        while self._active < self.max_concurrent:
+            ticket = self._next_ticket()
+            if ticket is None:
+                return
+            self._waiting.remove(ticket)
+            self._active += 1
+            self._active_by_session[ticket.session_id] += 1
+            self._wait_times.append(time.monotonic() - ticket.enqueued_at)
+            if self.request_timeout and self.request_timeout > 0:
+                ticket._timer = threading.Timer(self.request_timeout, self._expire, args=(ticket,))
+                ticket._timer.daemon = True
+                ticket._timer.start()
+            ticket.grant()
+
+    def _enqueue(self, session_id: str, priority: int) -> _Ticket:
+        with self._lock:
+            if len(self._waiting) >= self.max_queue_size and self._active >= self.max_concurrent:
+                self.stats["shed"] += 1
+                raise LLMOverloadedError("LLM 대기열이 가득 찼습니다.")
+            ticket = _Ticket(session_id, priority, next(self._seq))
+            self._waiting.append(ticket)
+            self._dispatch()
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._waiting))
+            return ticket
+
+    def _abandon(self, ticket: _Ticket, timed_out: bool = True):
+        """대기를 포기한 요청 정리 - 그 사이 권한을 받았다면 반납"""
+        with self._lock:
+            if ticket.granted:
+                self._release_locked(ticket)
+            else:
+                self._waiting.remove(ticket)
+            if timed_out:
+                self.stats["queue_timeouts"] += 1
+                self.stats["shed"] += 1
+
+    def _expire(self, ticket: _Ticket):
+        """request_timeout이 지나도 반납되지 않은 슬롯을 회수하는 함수 (타이머 스레드에서 호출)"""
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.expired = True
+            self.stats["request_timeouts"] += 1
+            self._release_locked(ticket)
+
+    def _release_locked(self, ticket: _Ticket):
+        # 회수된 슬롯을 요청이 끝날 때 다시 반납하지 않도록 한 번만 처리
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket._timer is not None:
+            ticket._timer.cancel()
+        self._active -= 1
+        self._active_by_session[ticket.session_id] -= 1
+        if self._active_by_session[ticket.session_id] <= 0:
+            del self._active_by_session[ticket.session_id]
+        self._dispatch()
+
+    def _release(self, ticket: _Ticket):
+        with self._lock:
+            if not ticket.expired:
+                self.stats["completed"] += 1
+            self._release_locked(ticket)
+
+    @contextmanager
+    def slot(self, session_id: str = "default", priority: int = PRIORITY_INTERACTIVE):
+        """실행 슬롯을 얻을 때까지 대기하는 컨텍스트 매니저 (거절 시 LLMOverloadedError)
+
+        티켓을 돌려주므로, 스트리밍 호출 측은 ticket.expired가 되면 생성을 멈춰야 합니다.
+        """
+        ticket = self._enqueue(session_id, priority)
+        if not ticket._event.wait(self.queue_timeout):
+            self._abandon(ticket)
+            raise LLMOverloadedError("LLM 대기 시간이 초과되었습니다.")
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def async_slot(self, session_id: str = "default", priority: int = PRIORITY_INTERACTIVE):
+        """slot()의 asyncio 버전 - 대기 중에 이벤트 루프를 막지 않음"""
+        ticket = self._enqueue(session_id, priority)
+        if not ticket.granted:
+            loop = asyncio.get_running_loop()
+            granted = loop.create_future()
+
+            def wake():
+                loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+            with self._lock:
+                ticket._wakers.append(wake)
+                if ticket.granted:
+                    wake()
+            try:
+                await asyncio.wait_for(granted, self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._abandon(ticket)
+                raise LLMOverloadedError("LLM 대기 시간이 초과되었습니다.")
+            except asyncio.CancelledError:
+                # 클라이언트 연결이 끊기면 대기열에서 빼고 슬롯이 새지 않도록 반납
+                self._abandon(ticket, timed_out=False)
+                raise
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def run(self, generate: Callable[[], str], session_id: str = "default",
+            priority: int = PRIORITY_INTERACTIVE) -> str:
+        """슬롯을 얻어 generate()를 실행하는 함수 (거절 시 LLMOverloadedError)"""
+        with self.slot(session_id, priority):
+            return generate()
+
+    def get_stats(self) -> Dict[str, float]:
+        """대기열 길이, 실행 중인 요청 수, 대기 시간 통계를 반환하는 함수"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                **self.stats,
+                "queue_depth": len(self._waiting),
+                "active": self._active,
+                "max_concurrent": self.max_concurrent,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """프로세스 전체에서 공유하는 LLM 스케줄러를 반환하는 함수 (performance 설정 사용)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                performance_settings = settings.get_performance_settings()
+                _scheduler = LLMScheduler(
+                    max_concurrent=performance_settings.get("max_concurrent_requests", 10),
+                    max_queue_size=performance_settings.get("max_queue_size", 50),
+                    queue_timeout=performance_settings.get("queue_timeout", 10),
+                    request_timeout=performance_settings.get("request_timeout", 30),
+                )
+    return _scheduler
@@ -0,0 +1,127 @@
+"""
+메타데이터 필터링용 색인 모듈
+
+데이터셋 로드 시 full_df의 '운동 부위', '도구', '체력 요소' 컬럼 값마다 행 번호 목록(posting list)을 만들고,
+질문 분석 결과(신체 부위/목표)와 질문에 나온 도구 이름으로 후보 행을 미리 좁혀
+벡터/키워드 검색이 전체 코퍼스 대신 후보 안에서만 점수를 계산하게 합니다.
+후보가 너무 적으면 조건을 하나씩 풀고, 그래도 부족하면 필터 없이 검색합니다.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.question_analyzer import default_analyzer
+
+BODY_PART_COLUMN = "운동 부위"
+EQUIPMENT_COLUMN = "도구"
+FITNESS_COLUMN = "체력 요소"
+METADATA_COLUMNS = (BODY_PART_COLUMN, EQUIPMENT_COLUMN, FITNESS_COLUMN)
+MISSING_VALUE = "정보 없음"
+
+# 후보가 부족할 때 먼저 푸는 조건 순서 (추론이 가장 느슨한 것부터, 질문에 직접 나온 도구는 마지막)
+RELAX_ORDER = (FITNESS_COLUMN, BODY_PART_COLUMN, EQUIPMENT_COLUMN)
+
+# 질문 분석기의 신체 부위 범주 -> '운동 부위' 값 ('전신'은 필터하지 않음)
+BODY_PART_VALUES = {
+    '상체': ['상체', '팔', '어깨', '가슴', '등', '목', '광배근', '소흉근', '견갑하근', '흉추', '흉추부', '후두부'],
+    '하체': ['하체', '다리', '허벅지', '종아리', '발목', '엉덩이', '둔부', '골반', '대퇴부', '대퇴이두근',
+             '대퇴사두근', '대퇴근막장근', '내전근', '이상근', '장요근', '비복근'],
+    '복부': ['복근', '코어', '몸통', '옆구리', '허리'],
+}
+
+# 질문 분석기의 목표 -> '체력 요소' 값 (대응하는 체력 요소가 없는 목표는 필터하지 않음)
+GOAL_VALUES = {
+    '강화': ['근력', '근지구력'],
+    '유연성': ['유연성'],
+    '지구력': ['근지구력'],
+}
+
+
+def split_values(value) -> List[str]:
+    """'하체/복근'처럼 '/'로 묶인 메타데이터 값을 나누는 함수 (빈 값, '정보 없음' 제외)"""
+    if not isinstance(value, str):
+        return []
+    return [part.strip() for part in value.split("/") if part.strip() and part.strip() != MISSING_VALUE]
+
+
+class MetadataIndex:
+    """메타데이터 컬럼 값 -> 행 번호 배열(정렬됨) 색인"""
+
+    def __init__(self, min_equipment_length: int = 2):
+        # 한 글자 도구 이름('공')은 다른 단어('공부', '공간')에 섞여 오탐이 많으므로 질문 매칭에서 제외
+        self.min_equipment_length = min_equipment_length
+        self.n_rows = 0
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+        self._equipment_pattern = None
+        self._cached_candidates = lru_cache(maxsize=256)(self._compute_candidates)
+
+    def build(self, df: pd.DataFrame):
+        """DataFrame의 메타데이터 컬럼으로 색인을 빌드하는 함수 (없는 컬럼은 건너뜀)"""
+        self.n_rows = len(df)
+        self.postings = {}
+        for column in METADATA_COLUMNS:
+            if column not in df.columns:
+                continue
+            rows: Dict[str, List[int]] = {}
+            for row, value in enumerate(df[column].tolist()):
+                for part in split_values(value):
+                    rows.setdefault(part, []).append(row)
+            self.postings[column] = {part: np.asarray(ids, dtype=np.int64) for part, ids in rows.items()}
+
+        equipment = [name for name in self.postings.get(EQUIPMENT_COLUMN, {}) if len(name) >= self.min_equipment_length]
+        self._equipment_pattern = re.compile(
+            "|".join(re.escape(name) for name in sorted(equipment, key=len, reverse=True))
+        ) if equipment else None
+        self._cached_candidates.cache_clear()
+        return self
+
+    def extract_filters(self, question: str) -> Dict[str, List[str]]:
+        """질문에서 메타데이터 조건({컬럼: 값 목록})을 추출하는 함수 (색인에 있는 값만)"""
+        body_part, goal = default_analyzer.extract_body_part_and_goal(question)
+        filters = {
+            BODY_PART_COLUMN: BODY_PART_VALUES.get(body_part, []),
+            FITNESS_COLUMN: GOAL_VALUES.get(goal, []),
+            EQUIPMENT_COLUMN: sorted(set(self._equipment_pattern.findall(question))) if self._equipment_pattern else [],
+        }
+        return {
+            column: [value for value in values if value in self.postings.get(column, {})]
+            for column, values in filters.items()
+            if any(value in self.postings.get(column, {}) for value in values)
+        }
+
+    def mask(self, column: str, values: Iterable[str]) -> np.ndarray:
+        """컬럼 값 중 하나라도 가진 행의 비트맵 (bool 배열)"""
+        postings = self.postings.get(column, {})
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for value in values:
+            if value in postings:
+                mask[postings[value]] = True
+        return mask
+
+    def candidates(self, filters: Dict[str, List[str]], min_candidates: int) -> Optional[np.ndarray]:
+        """조건을 모두 만족하는 행 번호(정렬됨, 읽기 전용)를 반환하는 함수
+
+        컬럼 사이는 AND, 같은 컬럼의 값 사이는 OR입니다. 후보가 min_candidates보다 적으면
+        RELAX_ORDER 순서로 조건을 하나씩 빼고 다시 계산하며, 끝까지 부족하거나 조건이 없으면 None(필터 없음).
+        조건 조합의 수는 많지 않으므로 결과를 캐시합니다.
+        """
+        key = tuple((column, tuple(filters[column])) for column in RELAX_ORDER if filters.get(column))
+        return self._cached_candidates(key, min_candidates)
+
+    def _compute_candidates(self, key: Tuple[Tuple[str, Tuple[str, ...]], ...],
+                            min_candidates: int) -> Optional[np.ndarray]:
+        masks = [self.mask(column, values) for column, values in key]
+        while masks:
+            rows = np.flatnonzero(np.logical_and.reduce(masks))
+            if len(rows) >= min_candidates:
+                if len(rows) == self.n_rows:
+                    # 모든 행이 남으면 필터가 의미 없으므로 전체 인덱스 검색을 그대로 사용
+                    return None
+                rows.flags.writeable = False
+                return rows
+            masks = masks[1:]
+        return None
@@ -0,0 +1,190 @@
+"""
+단계별 지연시간 측정(메트릭) 모듈
+
+질의 임베딩, 벡터 검색, 키워드 검색, 컨텍스트/프롬프트 생성, LLM TTFT/전체 생성 시간 등을
+단계(stage)별 히스토그램으로 누적하고 p50/p95/p99를 계산합니다.
+
+Streamlit과 API 서버는 서로 다른 프로세스이므로, 각 프로세스는 누적값을
+performance.metrics_dir에 주기적으로 스냅샷(JSON)으로 기록하고
+/metrics(Prometheus 텍스트 형식)와 사이드바 대시보드는 모든 프로세스의 스냅샷을 합쳐 보여줍니다.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config.settings import settings
+
+# 히스토그램 버킷 상한 (초) - 마지막 버킷은 +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 대시보드 표시 순서 / 설명
+STAGES = {
+    "query_embed": "질의 임베딩",
+    "vector_search": "벡터 검색",
+    "keyword_search": "키워드 검색",
+    "retrieval": "검색 전체",
+    "context_build": "컨텍스트 생성",
+    "prompt_build": "프롬프트 생성",
+    "llm_ttft": "LLM 첫 토큰",
+    "llm_total": "LLM 전체",
+    "request_total": "요청 전체",
+}
+
+
+def _empty_stage() -> Dict:
+    return {"buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0}
+
+
+def quantile(stage: Dict, q: float) -> float:
+    """버킷 누적 분포에서 선형 보간으로 분위수를 추정하는 함수 (Prometheus histogram_quantile과 같은 방식)"""
+    total = stage["count"]
+    if total == 0:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for upper, count in zip(BUCKETS + (float("inf"),), stage["buckets"]):
+        if count and cumulative + count >= rank:
+            if upper == float("inf"):
+                return lower
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = upper
+    return lower
+
+
+def summarize(stages: Dict[str, Dict]) -> Dict[str, Dict[str, float]]:
+    """단계별 count/avg/p50/p95/p99(초)를 반환하는 함수"""
+    return {
+        name: {
+            "count": stage["count"],
+            "avg": stage["sum"] / stage["count"] if stage["count"] else 0.0,
+            "p50": quantile(stage, 0.50),
+            "p95": quantile(stage, 0.95),
+            "p99": quantile(stage, 0.99),
+        }
+        for name, stage in stages.items()
+    }
+
+
+def merge(snapshots: Iterable[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """여러 프로세스의 단계별 히스토그램을 합치는 함수"""
+    merged: Dict[str, Dict] = {}
+    for stages in snapshots:
+        for name, stage in stages.items():
+            target = merged.setdefault(name, _empty_stage())
+            target["buckets"] = [a + b for a, b in zip(target["buckets"], stage["buckets"])]
+            target["sum"] += stage["sum"]
+            target["count"] += stage["count"]
+    return merged
+
+
+class MetricsRegistry:
+    """단계별 지연시간 히스토그램 저장소 (프로세스당 하나, 스레드 안전)"""
+
+    def __init__(self, snapshot_dir: Optional[str] = None, flush_interval: float = 5.0):
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.flush_interval = flush_interval
+        self._stages: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def observe(self, stage: str, seconds: float):
+        """단계 소요 시간(초)을 기록하는 함수"""
+        with self._lock:
+            data = self._stages.setdefault(stage, _empty_stage())
+            index = next((i for i, upper in enumerate(BUCKETS) if seconds <= upper), len(BUCKETS))
+            data["buckets"][index] += 1
+            data["sum"] += seconds
+            data["count"] += 1
+        self._maybe_flush()
+
+    @contextmanager
+    def span(self, stage: str):
+        """with 블록의 실행 시간을 stage로 기록하는 컨텍스트 매니저"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return json.loads(json.dumps(self._stages))
+
+    def _snapshot_path(self) -> Path:
+        return self.snapshot_dir / f"{os.getpid()}.json"
+
+    def _maybe_flush(self, force: bool = False):
+        if self.snapshot_dir is None:
+            return
+        now = time.time()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            path = self._snapshot_path()
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps({"updated_at": now, "stages": self.snapshot()}), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def collect(self, max_age: float = 3600.0) -> Dict[str, Dict]:
+        """이 프로세스와 다른 프로세스 스냅샷을 합친 단계별 히스토그램을 반환하는 함수
+
+        max_age초 넘게 갱신되지 않은 스냅샷(종료된 프로세스)은 제외합니다.
+        """
+        self._maybe_flush(force=True)
+        if self.snapshot_dir is None or not self.snapshot_dir.exists():
+            return self.snapshot()
+
+        snapshots: List[Dict[str, Dict]] = []
+        now = time.time()
+        for path in self.snapshot_dir.glob("*.json"):
+            if path == self._snapshot_path():
+                continue
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if now - data.get("updated_at", 0) <= max_age:
+                snapshots.append(data.get("stages", {}))
+        snapshots.append(self.snapshot())
+        return merge(snapshots)
+
+    def render_prometheus(self) -> str:
+        """모든 프로세스를 합친 히스토그램을 Prometheus 텍스트 형식으로 반환하는 함수"""
+        lines = [
+            "# HELP rag_stage_duration_seconds RAG 파이프라인 단계별 소요 시간",
+            "# TYPE rag_stage_duration_seconds histogram",
+        ]
+        for name, stage in sorted(self.collect().items()):
+            cumulative = 0
+            for upper, count in zip(BUCKETS + (float("inf"),), stage["buckets"]):
+                cumulative += count
+                le = "+Inf" if upper == float("inf") else repr(upper)
+                lines.append(f'rag_stage_duration_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'rag_stage_duration_seconds_sum{{stage="{name}"}} {stage["sum"]}')
+            lines.append(f'rag_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """프로세스 공유 메트릭 저장소를 반환하는 함수"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry(settings.get("performance", "metrics_dir", "./.cache/metrics") or None)
+    return _registry
@@ -0,0 +1,137 @@
+"""
+ONNX Runtime 임베딩 백엔드 모듈
+
+bge-m3(XLM-RoBERTa)를 ONNX로 내보내고 (선택적으로 int8 동적 양자화) ONNX Runtime으로 실행합니다.
+bge-m3의 dense 임베딩은 [CLS] 토큰 출력을 L2 정규화한 값이므로
+sentence-transformers와 같은 풀링을 적용해 기존 임베딩 파일과 그대로 비교할 수 있습니다.
+
+필요 패키지: onnxruntime, transformers (내보내기 시 torch, onnx 추가)
+"""
+
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+FP32_FILENAME = "model.onnx"
+INT8_FILENAME = "model.int8.onnx"
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = False, opset: int = 17) -> Path:
+    """HuggingFace 모델을 ONNX로 내보내는 함수 (quantize=True면 int8 동적 양자화본도 생성)
+
+    bge-m3 float32 가중치는 2GB를 넘으므로 가중치는 외부 데이터 파일로 저장합니다.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = output_dir / FP32_FILENAME
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if not fp32_path.exists():
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        dummy = tokenizer(["임베딩 내보내기", "ONNX export"], padding=True, return_tensors="pt")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                str(fp32_path),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=opset,
+            )
+        tokenizer.save_pretrained(str(output_dir))
+
+    if not quantize:
+        return fp32_path
+
+    int8_path = output_dir / INT8_FILENAME
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(
+            str(fp32_path), str(int8_path),
+            weight_type=QuantType.QInt8,
+            use_external_data_format=True,
+        )
+    return int8_path
+
+
+class OnnxEmbeddings(Embeddings):
+    """ONNX Runtime으로 실행하는 bge-m3 임베딩 (CLS 풀링 + L2 정규화)"""
+
+    def __init__(self, model_name: str = "BAAI/bge-m3", model_dir: str = "./models/bge-m3-onnx",
+                 quantize: bool = False, normalize_embeddings: bool = True, batch_size: int = 32,
+                 max_length: int = 512, num_threads: Optional[int] = None):
+        self.model_name = model_name
+        self.model_dir = Path(model_dir)
+        self.quantize = quantize
+        self.normalize_embeddings = normalize_embeddings
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.num_threads = num_threads
+        self._session = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._session is not None:
+            return
+        with self._lock:
+            if self._session is not None:
+                return
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+
+            model_path = self.model_dir / (INT8_FILENAME if self.quantize else FP32_FILENAME)
+            if not model_path.exists():
+                # 처음 한 번만 내보내기 (수 분 소요)
+                model_path = export_onnx(self.model_name, str(self.model_dir), self.quantize)
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            self._tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+            self._session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """텍스트 목록을 (n, dim) float32 배열로 임베딩하는 함수"""
+        self._load()
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # 길이가 비슷한 문장끼리 배치해 패딩 연산을 줄이고, 결과는 원래 순서로 복원
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        outputs = [None] * len(texts)
+        for start in range(0, len(texts), self.batch_size):
+            batch_rows = order[start:start + self.batch_size]
+            tokens = self._tokenizer(
+                [texts[row] for row in batch_rows], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np",
+            )
+            hidden = self._session.run(None, {
+                "input_ids": tokens["input_ids"].astype(np.int64),
+                "attention_mask": tokens["attention_mask"].astype(np.int64),
+            })[0]
+            vectors = hidden[:, 0].astype(np.float32)
+            if self.normalize_embeddings:
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            for row, vector in zip(batch_rows, vectors):
+                outputs[row] = vector
+        return np.stack(outputs)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
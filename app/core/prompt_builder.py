@@ -1,82 +1,11 @@
-import re
+from core.question_analyzer import default_analyzer
 
 def extract_body_part_and_goal(question: str) -> tuple[str, str]:
-    """질문에서 신체 부위와 목표를 추출하는 함수"""
-    question_lower = question.lower()
-    
-    # 신체 부위 추출
-    body_parts = {
-        '상체': ['상체', '팔', '어깨', '가슴', '등', '팔꿈치', '손목'],
-        '하체': ['하체', '다리', '허벅지', '종아리', '발목', '무릎', '발'],
-        '복부': ['복부', '배', '코어', '복근', '허리'],
-        '전신': ['전신', '몸', '전체', '신체']
-    }
-    
-    detected_body_part = "전신"
-    for part, keywords in body_parts.items():
-        if any(keyword in question_lower for keyword in keywords):
-            detected_body_part = part
-            break
-    
-    # 목표 추출
-    goals = {
-        '강화': ['강화', '근력', '힘', '튼튼'],
-        '유연성': ['유연성', '스트레칭', '늘리기', '풀기'],
-        '통증 완화': ['통증', '아픔', '완화', '치료', '관절'],
-        '균형': ['균형', '안정성', '자세'],
-        '지구력': ['지구력', '체력', '스태미나']
-    }
-    
-    detected_goal = "기능 향상"
-    for goal, keywords in goals.items():
-        if any(keyword in question_lower for keyword in keywords):
-            detected_goal = goal
-            break
-    
-    return detected_body_part, detected_goal
+    """질문에서 신체 부위와 목표를 추출하는 함수 (컴파일된 QuestionAnalyzer 사용)"""
+    return default_analyzer.extract_body_part_and_goal(question)
 
 def _analyze_question_type(question: str) -> str:
-    q = question.lower()
-    
-    patterns = {
-        "운동 루틴 추천": [
-            r"(무엇|뭐|어떤).*(운동|루틴)",
-            r"(운동|자세|동작).*(추천|알려줘|뭐해|좋아)",
-            r"(상체|하체|복부|허리|어깨|팔|다리|무릎|목|코어).*운동"
-        ],
-        "방법/절차 문의": [
-            r"(어떻게|하는 ?법|방법|순서|단계|프로세스)",
-            r"(운동|자세|스트레칭).*자세히",
-            r"바르게.*(운동|자세)"
-        ],
-        "부위별 통증/건강 관련": [
-            r"(아프|통증|불편|결림|쑤심|삐끗|부상)",
-            r"(무릎|허리|어깨|목|팔꿈치|발목|척추|손목).*문제"
-        ],
-        "장비/운동기구 문의": [
-            r"(덤벨|밴드|짐볼|매트|바벨|벤치|기구|장비).*운동",
-            r"운동.*(도구|기구|장비).*어떤.*좋아"
-        ],
-        "운동 효과/지속 관련": [
-            r"(효과|지속|얼마나|기간|며칠|몇 주|시간).*운동",
-            r"(운동|스트레칭).*언제까지.*해야"
-        ],
-        "운동 안전/주의사항": [
-            r"(하면 안되는|주의할 점|잘못된 자세|위험|조심)",
-            r"(운동|자세).*하면.*안돼"
-        ],
-        "일반 정보": [
-            r"(정의|이론|원리|과학적 근거)",
-            r"(운동|헬스|스트레칭|자세).*이란"
-        ],
-    }
-
-    for category, regex_list in patterns.items():
-        for pattern in regex_list:
-            if re.search(pattern, q):
-                return category
-
-    return "기타 일반 문의"
+    return default_analyzer.analyze_question_type(question)
 
 TYPE_INSTRUCTIONS = {
     "운동 루틴 추천": "질문자가 원하는 신체 부위 또는 목표에 따라 4개의 운동을 표로 정리하고, 자세한 설명과 운동 가이드라인을 포함해 제공하세요.",
@@ -148,6 +77,9 @@ def generate_nori_prompt(question: str, body_part: str, goal: str = None) -> str
 
 # 고도화된 프롬프트 엔지니어링
 class AdvancedPromptBuilder:
+    # 프롬프트 내용이 바뀌면 올려서 이전 템플릿으로 만든 캐시 응답이 재사용되지 않도록 함
+    TEMPLATE_VERSION = "1"
+    
     def __init__(self):
         self.base_system_prompt = """당신은 운동 프로그램 전문 AI 어시스턴트입니다.
 사용자의 질문에 대해 정확하고 유용한 운동 정보를 제공하는 것이 목표입니다."""
@@ -219,6 +151,56 @@ class AdvancedPromptBuilder:
 **답변:**"""
         return prompt
     
+    def build_context(self, results):
+        """검색 결과(full_data 포함)를 프롬프트용 운동 데이터 컨텍스트로 만드는 함수"""
+        context_parts = []
+        for i, result in enumerate(results, 1):
+            # full_data에서 운동 정보 추출
+            full_data = result['full_data']
+            exercise_info = f"""
+=== 운동 데이터 {i} (유사도: {result['similarity']:.3f}) ===
+운동명: {full_data.get('운동명', 'N/A')}
+목적: {full_data.get('목적', 'N/A')}
+설명: {full_data.get('설명', 'N/A')}
+체력 요소: {full_data.get('체력 요소', 'N/A')}
+운동 부위: {full_data.get('운동 부위', 'N/A')}
+도구: {full_data.get('도구', 'N/A')}
+제작연도: {full_data.get('제작연도', 'N/A')}
+영상 링크: {full_data.get('영상 링크', 'N/A')}
+"""
+            context_parts.append(exercise_info)
+        
+        return "\n\n".join(context_parts)
+    
+    def build_low_confidence_prompt(self, context, question):
+        """검색 신뢰도가 낮을 때 일반 대화 + 참고 정보 프롬프트를 만드는 함수"""
+        return f"""당신은 운동 전문 AI 어시스턴트입니다.
+사용자의 질문에 정확하고 도움이 되는 답변을 제공하세요.
+
+다음은 관련될 수 있는 참고 정보입니다 (신뢰도가 낮아 참고용으로만 활용):
+{context}
+
+사용자 질문: {question}
+
+답변 (운동 관련 질문인 경우 4개 운동 프로그램 형태로, 일반 질문인 경우 자연스럽게 대화):"""
+    
+    def build_general_prompt(self, question):
+        """검색 결과가 없을 때 일반 대화 모드 프롬프트를 만드는 함수"""
+        return f"""당신은 운동 전문 AI 어시스턴트입니다.
+사용자의 질문에 정확하고 도움이 되는 답변을 제공하세요.
+
+운동 관련 질문인 경우:
+- 4개 운동 프로그램 형태로 답변
+- 목적에 맞는 구체적인 운동 추천
+- 각 운동별 상세 설명 제공
+
+일반 질문인 경우:
+- 친근하고 자연스럽게 대화
+
+사용자 질문: {question}
+
+답변:"""
+    
     def _analyze_question_type(self, question):
         # 새로운 정교한 질문 분석 함수 사용
         return _analyze_question_type(question)
@@ -1,14 +1,36 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from langchain_community.embeddings import HuggingFaceEmbeddings
 import os
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from config.settings import settings
+from core.vector_index import create_index, load_or_build_index
+from core.lexical_index import BM25Index
+from core.metadata_index import MetadataIndex
+from core.embedding_cache import QueryEmbeddingCache
+from core.embedding_service import get_embedding_batcher, get_embedding_service
+from core.metrics import get_metrics
 
 class MultiDatasetRetriever:
     def __init__(self):
         self.datasets = {}
-        self.embeddings_model = None
+        # 반복 질의의 임베딩 계산을 건너뛰기 위한 캐시
+        performance_settings = settings.get_performance_settings()
+        enable_caching = performance_settings.get("enable_caching", True)
+        self.query_cache = QueryEmbeddingCache(
+            max_size=performance_settings.get("query_cache_size", 1024) if enable_caching else 0,
+            cache_dir=performance_settings.get("query_cache_dir") if enable_caching else None,
+            namespace=get_embedding_service().namespace
+        )
+        # hybrid 모드에서 임베딩 검색을 키워드 검색과 병렬로 실행하기 위한 스레드 풀
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retriever")
+        # 여러 데이터셋을 동시에 검색하기 위한 스레드 풀 (NumPy/FAISS 연산은 GIL을 놓음)
+        # hybrid 검색이 위 풀에 작업을 넣고 기다리므로 교착을 피하기 위해 별도 풀 사용
+        self._fanout_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retriever-fanout")
         
     def load_dataset(self, name, text_csv_path, full_csv_path, embeddings_npy_path):
         try:
@@ -17,18 +39,46 @@ class MultiDatasetRetriever:
             
             # 임베딩 파일 로드 시도 (실패해도 텍스트 검색으로 대체)
             try:
-                embeddings = np.load(embeddings_npy_path)
+                # mmap으로 로드해 워커 프로세스 간 페이지 캐시를 공유 (필요한 페이지만 읽음)
+                mmap_mode = 'r' if settings.get("data", "mmap_embeddings", True) else None
+                embeddings = np.load(embeddings_npy_path, mmap_mode=mmap_mode)
                 use_embeddings = True
             except:
                 embeddings = None
                 use_embeddings = False
                 st.warning(f"임베딩 파일을 로드할 수 없어 텍스트 기반 검색을 사용합니다.")
             
+            # 벡터 인덱스 로드/빌드 (로드 시 한 번만 수행)
+            index = None
+            if use_embeddings:
+                search_settings = settings.get_search_settings()
+                try:
+                    index = load_or_build_index(
+                        embeddings, embeddings_npy_path,
+                        search_settings.get("index_type", "exact"), search_settings
+                    )
+                except Exception as e:
+                    st.warning(f"벡터 인덱스 생성 실패, 정확 검색을 사용합니다: {e}")
+                    index = create_index("exact", search_settings)
+                    index.build(embeddings)
+            
+            # 키워드 검색용 역색인 (임베딩 실패 시 폴백)
+            lexical_index = BM25Index().build(text_df['text'])
+            # 운동 부위/도구/체력 요소별 행 번호 색인 (질문 조건으로 검색 후보를 미리 좁힘)
+            metadata_index = MetadataIndex().build(full_df)
+            
+            text_column = 'text'
             self.datasets[name] = {
                 'text_df': text_df,
                 'full_df': full_df,
+                # 검색 결과를 pandas 행 접근 없이 O(k)로 만들기 위해 로드 시 한 번 변환
+                'texts': text_df[text_column].tolist(),
+                'records': full_df.to_dict('records'),
                 'embeddings': embeddings,
-                'text_column': 'text',
+                'index': index,
+                'lexical_index': lexical_index,
+                'metadata_index': metadata_index,
+                'text_column': text_column,
                 'use_embeddings': use_embeddings
             }
             
@@ -38,96 +88,219 @@ class MultiDatasetRetriever:
             st.error(f"데이터셋 '{name}' 로드 실패: {e}")
             return False
     
-    def search_similar_docs(self, query, dataset_name, top_k=5):
+    def _get_embeddings_model(self):
+        # 업로드 파일 임베딩 등과 같은 프로세스 공유 모델 사용
+        return get_embedding_service()
+    
+    def _embed_query_uncached(self, query):
+        # 동시 세션의 질의를 마이크로 배치로 묶어 계산 (비활성화 시 모델 직접 호출)
+        batcher = get_embedding_batcher()
+        if batcher is not None:
+            return batcher.embed_query(query)
+        return self._get_embeddings_model().embed_query(query)
+    
+    def embed_query(self, query):
+        """질의 임베딩을 반환하는 함수 (캐시 사용, 임베딩을 사용할 수 없으면 None)"""
+        if not any(dataset['use_embeddings'] for dataset in self.datasets.values()):
+            return None
+        try:
+            with get_metrics().span("query_embed"):
+                return self.query_cache.get_or_compute(query, self._embed_query_uncached)
+        except Exception:
+            return None
+    
+    def _dense_search(self, query, dataset, top_k, query_embedding=None, candidate_ids=None):
+        """임베딩 기반 검색 - (질의 임베딩, 유사도, 행 인덱스) 반환 (candidate_ids가 있으면 그 행 중에서만)"""
+        if query_embedding is None:
+            with get_metrics().span("query_embed"):
+                query_embedding = self.query_cache.get_or_compute(query, self._embed_query_uncached)
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        
+        with get_metrics().span("vector_search"):
+            if candidate_ids is not None:
+                scores, top_indices = dataset['index'].search_subset(query_embedding, candidate_ids, top_k)
+            else:
+                scores, top_indices = dataset['index'].search(query_embedding, top_k)
+        return query_embedding, scores, top_indices
+    
+    @staticmethod
+    def _cosine_scores(dataset, query_embedding, indices):
+        """지정한 행들에 대해서만 코사인 유사도를 계산하는 함수"""
+        vectors = np.asarray(dataset['embeddings'][indices], dtype=np.float32)
+        query_vector = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+        return vectors @ query_vector / np.maximum(norms, 1e-12)
+    
+    @staticmethod
+    def _fuse(dense_indices, dense_scores, lexical_indices, lexical_scores, top_k, search_settings):
+        """두 검색 결과를 RRF 또는 가중합으로 융합해 (행 인덱스, 융합 점수) 목록을 반환하는 함수"""
+        fused = {}
+        if search_settings.get("fusion", "rrf") == "weighted":
+            dense_weight = float(search_settings.get("dense_weight", 0.7))
+            for weight, scores, indices in ((dense_weight, dense_scores, dense_indices),
+                                            (1 - dense_weight, lexical_scores, lexical_indices)):
+                for score, idx in zip(scores, indices):
+                    fused[int(idx)] = fused.get(int(idx), 0.0) + weight * float(score)
+        else:
+            rrf_k = int(search_settings.get("rrf_k", 60))
+            for indices in (dense_indices, lexical_indices):
+                for rank, idx in enumerate(indices, 1):
+                    fused[int(idx)] = fused.get(int(idx), 0.0) + 1.0 / (rrf_k + rank)
+        
+        return sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+    
+    def _hybrid_search(self, query, dataset, top_k, search_settings, query_embedding=None, candidate_ids=None):
+        """임베딩 검색과 BM25 검색을 병렬로 실행한 뒤 결과를 융합하는 함수"""
+        pool_size = max(top_k, int(search_settings.get("candidate_pool", 20)))
+        
+        dense_future = self._executor.submit(
+            self._dense_search, query, dataset, pool_size, query_embedding, candidate_ids
+        )
+        with get_metrics().span("keyword_search"):
+            lexical_scores, lexical_indices = dataset['lexical_index'].search(query, pool_size, candidate_ids)
+        query_embedding, dense_scores, dense_indices = dense_future.result()
+        
+        fused = self._fuse(dense_indices, dense_scores, lexical_indices, lexical_scores, top_k, search_settings)
+        indices = np.array([idx for idx, _ in fused], dtype=np.int64)
+        fused_scores = [score for _, score in fused]
+        
+        # 키워드 검색에서만 나온 문서도 동일한 기준(코사인)의 유사도를 표시
+        similarities = self._cosine_scores(dataset, query_embedding, indices)
+        return self._build_results(dataset, indices, similarities, fused_scores)
+    
+    @staticmethod
+    def _build_results(dataset, indices, similarities, scores):
+        results = []
+        texts, records = dataset['texts'], dataset['records']
+        for idx, similarity_score, score in zip(indices, similarities, scores):
+            idx = int(idx)
+            results.append({
+                'content': texts[idx],
+                'similarity': float(similarity_score),
+                'score': float(score),  # 정렬 기준 점수 (hybrid 모드에서는 융합 점수)
+                'full_data': dict(records[idx]),  # 호출 측 수정이 원본에 반영되지 않도록 복사
+                'index': idx
+            })
+        
+        return results
+    
+    @staticmethod
+    def _metadata_candidates(query, dataset, top_k, search_settings):
+        """질문의 신체 부위/목표/도구로 좁힌 후보 행 번호 (필터를 쓰지 않으면 None)"""
+        if not search_settings.get("metadata_filter", False):
+            return None
+        metadata_index = dataset['metadata_index']
+        filters = metadata_index.extract_filters(query)
+        if not filters:
+            return None
+        min_candidates = max(top_k, int(search_settings.get("filter_min_candidates", 50)))
+        return metadata_index.candidates(filters, min_candidates)
+    
+    def search_similar_docs(self, query, dataset_name, top_k=5, mode=None, query_embedding=None, strict=False):
+        """데이터셋에서 질의와 관련된 문서를 검색하는 함수
+        
+        mode: "dense"(임베딩), "lexical"(BM25), "hybrid"(둘을 병렬 실행 후 융합).
+        지정하지 않으면 search.retrieval_mode 설정값을 사용합니다.
+        query_embedding을 넘기면 질의 임베딩을 다시 계산하지 않습니다.
+        search.metadata_filter가 켜져 있으면 질문에서 추출한 운동 부위/도구/체력 요소 조건에 맞는 행 중에서만 검색합니다.
+        strict=True면 임베딩 검색 실패 시 텍스트 검색으로 대체하지 않고 예외를 그대로 발생시킵니다 (벤치마크용).
+        """
         if dataset_name not in self.datasets:
             return []
             
         dataset = self.datasets[dataset_name]
+        search_settings = settings.get_search_settings()
+        mode = mode or search_settings.get("retrieval_mode", "hybrid")
+        candidate_ids = self._metadata_candidates(query, dataset, top_k, search_settings)
+        if strict and mode != "lexical" and not (dataset['use_embeddings'] and dataset['index'] is not None):
+            raise RuntimeError(f"{dataset_name} 데이터셋은 임베딩 검색을 사용할 수 없습니다.")
         
-        if dataset['use_embeddings'] and dataset['embeddings'] is not None:
-            # 임베딩 기반 검색
+        if mode != "lexical" and dataset['use_embeddings'] and dataset['index'] is not None:
             try:
-                if self.embeddings_model is None:
-                    # 차원을 명시적으로 설정하여 일관성 보장
-                    self.embeddings_model = HuggingFaceEmbeddings(
-                        model_name="BAAI/bge-m3",
-                        model_kwargs={'device': 'cpu'},
-                        encode_kwargs={'normalize_embeddings': True}
-                    )
-                
-                query_embedding = self.embeddings_model.embed_query(query)
-                query_embedding = np.array(query_embedding).reshape(1, -1)
-                
-                similarities = cosine_similarity(query_embedding, dataset['embeddings'])[0]
-                top_indices = np.argsort(similarities)[::-1][:top_k]
+                if mode == "hybrid":
+                    return self._hybrid_search(query, dataset, top_k, search_settings, query_embedding, candidate_ids)
                 
-                results = []
-                for idx in top_indices:
-                    similarity_score = similarities[idx]
-                    text_content = dataset['text_df'].iloc[idx][dataset['text_column']]
-                    full_data = dataset['full_df'].iloc[idx].to_dict()
-                    
-                    results.append({
-                        'content': text_content,
-                        'similarity': similarity_score,
-                        'full_data': full_data,
-                        'index': idx
-                    })
-                    
-                return results
+                _, scores, top_indices = self._dense_search(query, dataset, top_k, query_embedding, candidate_ids)
+                return self._build_results(dataset, top_indices, scores, scores)
                 
             except Exception as e:
+                if strict:
+                    raise
+                # 이번 질의만 텍스트 검색으로 대체 (데이터셋의 임베딩 검색은 계속 사용)
                 st.warning(f"임베딩 검색 실패, 텍스트 검색으로 대체: {e}")
-                dataset['use_embeddings'] = False
         
-        # 텍스트 기반 검색 (임베딩 실패 시)
-        if not dataset['use_embeddings']:
-            query_lower = query.lower()
-            results = []
-            
-            for idx, row in dataset['text_df'].iterrows():
-                text_content = row[dataset['text_column']]
-                text_lower = text_content.lower()
-                
-                # 키워드 매칭 점수 계산
-                score = 0
-                for word in query_lower.split():
-                    if word in text_lower:
-                        score += 1
-                
-                if score > 0:
-                    results.append({
-                        'content': text_content,
-                        'similarity': score / len(query_lower.split()),  # 정규화된 점수
-                        'full_data': dataset['full_df'].iloc[idx].to_dict(),
-                        'index': idx
-                    })
-            
-            # 점수 기준으로 정렬
-            results.sort(key=lambda x: x['similarity'], reverse=True)
-            return results[:top_k]
+        # 텍스트 기반 검색 (lexical 모드 또는 임베딩 실패 시)
+        with get_metrics().span("keyword_search"):
+            scores, top_indices = dataset['lexical_index'].search(query, top_k, candidate_ids)
+        return self._build_results(dataset, top_indices, scores, scores)
+    
+    def search_many(self, query, dataset_names, top_k=5, mode=None):
+        """여러 데이터셋을 동시에 검색해 점수 상위 top_k개를 반환하는 함수
+        
+        질의는 한 번만 임베딩하고, 데이터셋별 결과(점수 내림차순)를 힙으로 병합합니다.
+        각 결과에는 'dataset' 키로 출처 데이터셋 이름이 추가됩니다.
+        """
+        with get_metrics().span("retrieval"):
+            return self._search_many(query, dataset_names, top_k, mode)
+    
+    def _search_many(self, query, dataset_names, top_k, mode):
+        dataset_names = [name for name in dataset_names if name in self.datasets]
+        if not dataset_names:
+            return []
+        
+        mode = mode or settings.get("search", "retrieval_mode", "hybrid")
+        query_embedding = self.embed_query(query) if mode != "lexical" else None
+        
+        # 작업 스레드에서도 st.warning 등이 현재 세션에 표시되도록 실행 컨텍스트 연결
+        ctx = get_script_run_ctx()
+        
+        def search_one(dataset_name):
+            add_script_run_ctx(ctx=ctx)
+            results = self.search_similar_docs(query, dataset_name, top_k, mode, query_embedding)
+            for result in results:
+                result['dataset'] = dataset_name
+            return results
+        
+        if len(dataset_names) == 1:
+            per_dataset = [search_one(dataset_names[0])]
+        else:
+            per_dataset = list(self._fanout_executor.map(search_one, dataset_names))
         
-        return []
+        merged = heapq.merge(*per_dataset, key=lambda result: -result['score'])
+        return list(itertools.islice(merged, top_k))
     
     def get_available_datasets(self):
         return list(self.datasets.keys())
 
+# 로드할 데이터셋 (이름 -> 파일 경로)
+DATASETS_CONFIG = {
+    "실제 데이터": {
+        "text_csv": "./data/text_ex.csv",
+        "full_csv": "./data/full_data_ex.csv", 
+        "embeddings": "./data/embeddings_ex.npy"
+    }
+}
+
+def create_retriever(datasets_config=None):
+    """데이터셋을 로드한 검색기와 로드된 데이터셋 목록을 반환하는 함수 (Streamlit 캐시 없이 API 서버 등에서 사용)"""
+    retriever = MultiDatasetRetriever()
+    
+    loaded_datasets = []
+    for name, config in (datasets_config or DATASETS_CONFIG).items():
+        if retriever.load_dataset(name, config["text_csv"], config["full_csv"], config["embeddings"]):
+            loaded_datasets.append(name)
+    
+    # 첫 질의가 모델 로드 시간을 떠안지 않도록 미리 로드
+    uses_embeddings = any(dataset['use_embeddings'] for dataset in retriever.datasets.values())
+    if uses_embeddings and settings.get("embeddings", "warmup", True):
+        try:
+            get_embedding_service().warmup()
+        except Exception as e:
+            st.warning(f"임베딩 모델 워밍업 실패: {e}")
+    
+    return retriever, loaded_datasets
+
 @st.cache_resource(show_spinner=False)
 def load_datasets():
     with st.spinner("🔄 데이터셋을 로딩하고 있습니다..."):
-        retriever = MultiDatasetRetriever()
-        
-        datasets_config = {
-            "실제 데이터": {
-                "text_csv": "./data/text_ex.csv",
-                "full_csv": "./data/full_data_ex.csv", 
-                "embeddings": "./data/embeddings_ex.npy"
-            }
-        }
-        
-        loaded_datasets = []
-        for name, config in datasets_config.items():
-            if retriever.load_dataset(name, config["text_csv"], config["full_csv"], config["embeddings"]):
-                loaded_datasets.append(name)
-        
-        return retriever, loaded_datasets 
\ No newline at end of file
+        return create_retriever()
@@ -0,0 +1,444 @@
+"""
+벡터 인덱스 백엔드를 관리하는 모듈
+
+정확 검색(exact, flat), 근사 검색(IVF, HNSW), 압축 검색(SQ8, PQ) 인덱스를
+동일한 인터페이스로 제공합니다.
+FAISS 인덱스는 임베딩 파일(.npy) 옆에 저장되어 다음 실행 시 다시 빌드하지 않습니다.
+빌드 파라미터(ivf_nlist, hnsw_m 등)는 인덱스 옆 JSON에 함께 저장되어, 설정이 바뀌면 다시 빌드합니다.
+
+exact는 mmap된 임베딩 행렬을 직접 스캔하므로 워커 간 메모리를 공유하지만,
+flat/hnsw는 빌드 시 정규화된 사본을 각 프로세스 힙에 만듭니다 (저장본 로드 시에는 mmap).
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """점수 상위 top_k개의 위치를 점수 내림차순으로 반환하는 함수
+
+    전체 정렬(O(n log n)) 대신 argpartition(O(n))으로 후보를 고른 뒤 k개만 정렬합니다.
+    동점은 위치 순으로 정렬해 결과를 결정적으로 유지합니다.
+    """
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < len(scores):
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def exact_subset_search(embeddings: np.ndarray, query_vector: np.ndarray, ids: np.ndarray,
+                        top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """지정한 행들에 대해서만 코사인 유사도를 계산해 상위 top_k개를 반환하는 함수 (query_vector는 정규화된 1차원)"""
+    # 정렬된 행 번호로 읽어야 mmap 파일을 순차적으로 접근
+    ids = np.sort(np.asarray(ids, dtype=np.int64))
+    vectors = np.asarray(embeddings[ids], dtype=np.float32)
+    similarities = vectors @ query_vector / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+    order = top_k_indices(similarities, top_k)
+    return similarities[order], ids[order]
+
+
+class VectorIndex:
+    """벡터 인덱스 공통 인터페이스"""
+
+    index_type = "base"
+    persistent = False
+    # 인덱스 구조를 결정하는 빌드 파라미터와 기본값 (저장된 인덱스 재사용 여부 판단에 사용)
+    build_param_defaults: Dict[str, Any] = {}
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        # params는 Settings의 search 섹션을 그대로 받으므로 런타임 변경이 바로 반영됩니다
+        self.params = params if params is not None else {}
+
+    @property
+    def ntotal(self) -> int:
+        raise NotImplementedError
+
+    def build_params(self) -> Dict[str, Any]:
+        """현재 설정 기준의 빌드 파라미터 (설정에 없으면 기본값)"""
+        return {key: int(self.params.get(key, default)) for key, default in self.build_param_defaults.items()}
+
+    def build(self, embeddings: np.ndarray):
+        """임베딩 행렬로 인덱스를 빌드하는 함수"""
+        raise NotImplementedError
+
+    def search(self, query_embedding: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(유사도, 행 인덱스) 배열을 유사도 내림차순으로 반환하는 함수"""
+        raise NotImplementedError
+
+    def search_subset(self, query_embedding: np.ndarray, ids: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ids 행 중에서만 검색하는 함수 (메타데이터 필터링) - 후보 행만 원본 벡터로 정확히 계산"""
+        query_vector = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+        return exact_subset_search(self.embeddings, query_vector, ids, top_k)
+
+    def save(self, path: Path):
+        """인덱스를 파일로 저장하는 함수"""
+        raise NotImplementedError
+
+    def load(self, path: Path) -> bool:
+        """저장된 인덱스를 로드하는 함수"""
+        return False
+
+
+class ExactIndex(VectorIndex):
+    """임베딩 행렬 전체와의 코사인 유사도를 직접 계산하는 정확 검색
+
+    행렬을 복사하지 않고 그대로 스캔하므로, mmap으로 로드한 임베딩을 여러 워커 프로세스가
+    페이지 캐시 한 벌로 공유할 수 있습니다.
+    """
+
+    index_type = "exact"
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        super().__init__(params)
+        self.embeddings = None
+        self.inverse_norms = None
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.embeddings is None else len(self.embeddings)
+
+    @staticmethod
+    def _row_norms(embeddings: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        # mmap 행렬 전체를 한 번에 메모리에 올리지 않도록 청크 단위로 계산
+        return np.concatenate([
+            np.linalg.norm(np.asarray(embeddings[start:start + chunk_size], dtype=np.float32), axis=1)
+            for start in range(0, len(embeddings), chunk_size)
+        ])
+
+    def build(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+        self.inverse_norms = None
+
+        # bge-m3를 normalize_embeddings=True로 저장했다면 내적이 곧 코사인 유사도
+        sample_norms = np.linalg.norm(np.asarray(embeddings[:1000], dtype=np.float32), axis=1)
+        if len(sample_norms) and not np.allclose(sample_norms, 1.0, atol=1e-3):
+            self.inverse_norms = 1.0 / np.maximum(self._row_norms(embeddings), 1e-12)
+
+    def _scan(self, query_vector: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        if self.embeddings.dtype in (np.float32, np.float64):
+            return self.embeddings @ query_vector.astype(self.embeddings.dtype)
+        # float16 저장본은 BLAS를 쓸 수 없으므로 청크 단위로 float32 변환 후 계산
+        return np.concatenate([
+            np.asarray(self.embeddings[start:start + chunk_size], dtype=np.float32) @ query_vector
+            for start in range(0, len(self.embeddings), chunk_size)
+        ])
+
+    def search(self, query_embedding: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query_vector = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+
+        similarities = self._scan(query_vector)
+        if self.inverse_norms is not None:
+            similarities *= self.inverse_norms
+        top_indices = top_k_indices(similarities, top_k)
+        return similarities[top_indices], top_indices
+
+    def search_subset(self, query_embedding: np.ndarray, ids: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query_vector = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+
+        # 빌드 시 계산한 행 노름을 재사용 (정규화 저장본이면 내적이 곧 코사인 유사도)
+        ids = np.sort(np.asarray(ids, dtype=np.int64))
+        similarities = np.asarray(self.embeddings[ids], dtype=np.float32) @ query_vector
+        if self.inverse_norms is not None:
+            similarities *= self.inverse_norms[ids]
+        order = top_k_indices(similarities, top_k)
+        return similarities[order], ids[order]
+
+
+class FaissIndex(VectorIndex):
+    """FAISS 기반 인덱스의 공통 구현 (정규화 벡터 + 내적 = 코사인 유사도)"""
+
+    persistent = True
+    # 압축(양자화) 인덱스는 근사 점수로 후보를 넉넉히 뽑은 뒤 원본 벡터로 재정렬
+    quantized = False
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        super().__init__(params)
+        self.index = None
+        self.embeddings = None
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.index is None else self.index.ntotal
+
+    def _create(self, dimension: int, n_vectors: int):
+        raise NotImplementedError
+
+    def _apply_search_params(self):
+        """재현율/지연시간 조절 파라미터를 인덱스에 적용하는 함수"""
+        pass
+
+    @staticmethod
+    def _as_normalized(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.array(vectors, dtype=np.float32, order="C", copy=True)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def attach(self, embeddings: np.ndarray):
+        """재정렬에 사용할 원본 임베딩(mmap)을 연결하는 함수"""
+        self.embeddings = embeddings
+
+    def build(self, embeddings: np.ndarray):
+        vectors = self._as_normalized(embeddings)
+        self.index = self._create(vectors.shape[1], len(vectors))
+        if not self.index.is_trained:
+            self.index.train(vectors)
+        self.index.add(vectors)
+        self.attach(embeddings)
+
+    def add(self, embeddings: np.ndarray):
+        """이미 빌드된 인덱스 뒤에 벡터를 추가하는 함수 (행 번호는 기존 개수부터 이어짐)"""
+        self.index.add(self._as_normalized(embeddings))
+
+    def _rerank(self, query_vector: np.ndarray, indices: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """후보 행만 원본 벡터로 정확한 코사인 유사도를 다시 계산하는 함수"""
+        return exact_subset_search(self.embeddings, query_vector, indices, top_k)
+
+    def _search_parameters(self, selector) -> "faiss.SearchParameters":
+        """행 선택기(IDSelector)를 적용한 검색 파라미터 (인덱스별 재현율 파라미터 포함)"""
+        return faiss.SearchParameters(sel=selector)
+
+    def search_subset(self, query_embedding: np.ndarray, ids: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # 후보가 적으면 원본 벡터로 직접 계산하는 편이 빠르고 정확하며,
+        # 후보가 많으면 FAISS 검색 중에 IDSelector로 후보 밖의 행을 건너뜀
+        if self.embeddings is not None and len(ids) <= int(self.params.get("filter_exact_max", 50000)):
+            return super().search_subset(query_embedding, ids, top_k)
+
+        self._apply_search_params()
+        query_vector = self._as_normalized(query_embedding)
+        selector = faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))
+        rerank = self.quantized and self.embeddings is not None
+        shortlist_size = top_k * max(1, int(self.params.get("rerank_factor", 4))) if rerank else top_k
+        scores, indices = self.index.search(query_vector, shortlist_size, params=self._search_parameters(selector))
+        valid = indices[0] >= 0
+        scores, indices = scores[0][valid], indices[0][valid]
+
+        if rerank:
+            return self._rerank(query_vector[0], indices, top_k)
+        return scores, indices
+
+    def search(self, query_embedding: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        self._apply_search_params()
+        query_vector = self._as_normalized(query_embedding)
+
+        rerank = self.quantized and self.embeddings is not None
+        shortlist_size = top_k * max(1, int(self.params.get("rerank_factor", 4))) if rerank else top_k
+        scores, indices = self.index.search(query_vector, shortlist_size)
+        # 후보가 부족하면 FAISS는 -1을 채워서 반환
+        valid = indices[0] >= 0
+        scores, indices = scores[0][valid], indices[0][valid]
+
+        if rerank:
+            return self._rerank(query_vector[0], indices, top_k)
+        return scores, indices
+
+    def save(self, path: Path):
+        faiss.write_index(self.index, str(path))
+
+    def load(self, path: Path) -> bool:
+        try:
+            # mmap으로 읽으면 여러 워커 프로세스가 인덱스 데이터를 페이지 캐시로 공유
+            self.index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # mmap을 지원하지 않는 인덱스 타입/버전은 일반 로드
+            self.index = faiss.read_index(str(path))
+        return True
+
+
+class FlatIndex(FaissIndex):
+    """FAISS 정확 검색 인덱스"""
+
+    index_type = "flat"
+
+    def _create(self, dimension: int, n_vectors: int):
+        return faiss.IndexFlatIP(dimension)
+
+
+class IVFIndex(FaissIndex):
+    """역색인(IVF) 근사 검색 인덱스 - ivf_nprobe로 재현율/지연시간 조절"""
+
+    index_type = "ivf"
+    build_param_defaults = {"ivf_nlist": 256}
+
+    def _create(self, dimension: int, n_vectors: int):
+        # 클러스터당 최소 학습 샘플(39개)을 확보할 수 있도록 nlist 제한
+        nlist = max(1, min(self.build_params()["ivf_nlist"], n_vectors // 39))
+        quantizer = faiss.IndexFlatIP(dimension)
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+
+    def _apply_search_params(self):
+        ivf = faiss.extract_index_ivf(self.index)
+        ivf.nprobe = min(int(self.params.get("ivf_nprobe", 16)), ivf.nlist)
+
+    def _search_parameters(self, selector) -> "faiss.SearchParameters":
+        # 검색 파라미터를 넘기면 인덱스에 설정한 nprobe 대신 파라미터 값이 쓰이므로 함께 지정
+        return faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(self.index).nprobe)
+
+
+class HNSWIndex(FaissIndex):
+    """HNSW 그래프 근사 검색 인덱스 - hnsw_ef_search로 재현율/지연시간 조절"""
+
+    index_type = "hnsw"
+    build_param_defaults = {"hnsw_m": 32, "hnsw_ef_construction": 200}
+
+    def _create(self, dimension: int, n_vectors: int):
+        build_params = self.build_params()
+        index = faiss.IndexHNSWFlat(dimension, build_params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = build_params["hnsw_ef_construction"]
+        return index
+
+    def _apply_search_params(self):
+        self.index.hnsw.efSearch = int(self.params.get("hnsw_ef_search", 64))
+
+    def _search_parameters(self, selector) -> "faiss.SearchParameters":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=self.index.hnsw.efSearch)
+
+
+class SQ8Index(FaissIndex):
+    """차원별 범위로 학습한 int8 스칼라 양자화 인덱스 (float32 대비 1/4 크기)"""
+
+    index_type = "sq8"
+    quantized = True
+
+    def _create(self, dimension: int, n_vectors: int):
+        return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+
+
+class PQIndex(FaissIndex):
+    """곱 양자화(PQ) 인덱스 - 벡터당 pq_m 바이트 (1024차원, pq_m=256이면 float32 대비 1/16)"""
+
+    index_type = "pq"
+    quantized = True
+    build_param_defaults = {"pq_m": 256}
+
+    def _create(self, dimension: int, n_vectors: int):
+        # 서브벡터 수는 차원의 약수여야 하고, 코드북 학습에는 2^nbits개 이상의 샘플이 필요
+        pq_m = self.build_params()["pq_m"]
+        while dimension % pq_m:
+            pq_m -= 1
+        nbits = max(1, min(8, int(np.log2(max(n_vectors, 2)))))
+        return faiss.IndexPQ(dimension, pq_m, nbits, faiss.METRIC_INNER_PRODUCT)
+
+    def search_subset(self, query_embedding: np.ndarray, ids: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # IndexPQ는 검색 파라미터(IDSelector)를 지원하지 않으므로, 후보가 많으면
+        # 후보 비율만큼 넉넉히 뽑은 뒤 후보 밖의 행을 걸러내고 (부족하면 두 배씩 늘림) 원본 벡터로 재정렬
+        if self.embeddings is not None and len(ids) <= int(self.params.get("filter_exact_max", 50000)):
+            return VectorIndex.search_subset(self, query_embedding, ids, top_k)
+
+        self._apply_search_params()
+        query_vector = self._as_normalized(query_embedding)
+        ids = np.asarray(ids, dtype=np.int64)
+        rerank = self.embeddings is not None
+        wanted = top_k * max(1, int(self.params.get("rerank_factor", 4))) if rerank else top_k
+        fetch_size = wanted * max(1, -(-self.ntotal // max(len(ids), 1)))
+        while True:
+            fetch_size = min(fetch_size, self.ntotal)
+            scores, indices = self.index.search(query_vector, fetch_size)
+            keep = np.isin(indices[0], ids)
+            if keep.sum() >= wanted or fetch_size >= self.ntotal:
+                break
+            fetch_size *= 2
+        scores, indices = scores[0][keep][:wanted], indices[0][keep][:wanted]
+
+        if rerank:
+            return self._rerank(query_vector[0], indices, top_k)
+        return scores, indices
+
+
+INDEX_TYPES = {
+    "exact": ExactIndex,
+    "flat": FlatIndex,
+    "ivf": IVFIndex,
+    "hnsw": HNSWIndex,
+    "sq8": SQ8Index,
+    "pq": PQIndex,
+}
+
+
+def create_index(index_type: str, params: Optional[Dict[str, Any]] = None) -> VectorIndex:
+    """인덱스 타입 이름으로 빈 인덱스를 생성하는 함수"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 인덱스 타입입니다: {index_type} (지원: {', '.join(INDEX_TYPES)})")
+    return INDEX_TYPES[index_type](params)
+
+
+def get_index_path(embeddings_npy_path: str, index_type: str) -> Path:
+    """임베딩 파일 옆에 저장될 인덱스 파일 경로를 반환하는 함수"""
+    npy_path = Path(embeddings_npy_path)
+    return npy_path.with_name(f"{npy_path.stem}.{index_type}.faiss")
+
+
+def _build_params_path(index_path: Path) -> Path:
+    """저장된 인덱스의 빌드 파라미터 JSON 경로"""
+    return index_path.with_suffix(".json")
+
+
+def _saved_build_params(index_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(_build_params_path(index_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def load_or_build_index(embeddings: np.ndarray, embeddings_npy_path: str, index_type: str = "exact",
+                        params: Optional[Dict[str, Any]] = None) -> VectorIndex:
+    """저장된 인덱스가 최신이면 로드하고, 아니면 빌드 후 저장하는 함수"""
+    index = create_index(index_type, params)
+    if not index.persistent:
+        index.build(embeddings)
+        return index
+
+    index_path = get_index_path(embeddings_npy_path, index_type)
+    npy_path = Path(embeddings_npy_path)
+    # 빌드 파라미터가 다르면(설정 변경, 이전 버전 저장본) 구조가 다른 인덱스이므로 다시 빌드
+    if index_path.exists() and index_path.stat().st_mtime >= npy_path.stat().st_mtime \
+            and _saved_build_params(index_path) == index.build_params():
+        try:
+            if index.load(index_path) and index.ntotal == len(embeddings):
+                index.attach(embeddings)
+                return index
+        except Exception:
+            pass
+
+    index.build(embeddings)
+    try:
+        index.save(index_path)
+        _build_params_path(index_path).write_text(json.dumps(index.build_params()), encoding="utf-8")
+    except Exception as e:
+        print(f"Warning: 인덱스 저장 실패 ({index_path}): {e}")
+    return index
+
+
+def append_to_saved_indexes(embeddings_npy_path: str, new_embeddings: np.ndarray):
+    """행이 뒤에 추가되기만 한 경우, 저장된 FAISS 인덱스에 새 벡터만 추가해 다시 저장하는 함수"""
+    for index_type, index_class in INDEX_TYPES.items():
+        index_path = get_index_path(embeddings_npy_path, index_type)
+        if not index_class.persistent or not index_path.exists():
+            continue
+        index = index_class()
+        # load()는 읽기 전용 mmap으로 열기 때문에 수정용으로는 일반 모드로 읽음
+        index.index = faiss.read_index(str(index_path))
+        index.add(new_embeddings)
+        index.save(index_path)
+
+
+def remove_saved_indexes(embeddings_npy_path: str):
+    """임베딩 행 구성이 바뀌어 무효가 된 저장 인덱스를 삭제하는 함수 (다음 로드 시 재빌드)"""
+    for index_type, index_class in INDEX_TYPES.items():
+        index_path = get_index_path(embeddings_npy_path, index_type)
+        if index_class.persistent and index_path.exists():
+            index_path.unlink()
+        if index_class.persistent and _build_params_path(index_path).exists():
+            _build_params_path(index_path).unlink()
@@ -7,13 +7,11 @@ from langchain.storage import LocalFileStore
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.llms import Ollama
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.retrievers import EnsembleRetriever
 import os
+import uuid
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import time
 import plotly.graph_objects as go
 import plotly.express as px
@@ -22,8 +20,14 @@ import plotly.express as px
 from ui.styles import CUSTOM_CSS
 from core.prompt_builder import AdvancedPromptBuilder, extract_body_part_and_goal, _analyze_question_type, generate_nori_prompt
 from core.retriever import MultiDatasetRetriever, load_datasets
-from utils.helpers import print_history, add_history, format_docs
-from utils.data_loader import embed_file
+from core.answer_cache import load_answer_cache
+from core.llm import get_llm, warmup_llm
+from core.metrics import get_metrics
+from core.llm_scheduler import FALLBACK_RESPONSE, LLMOverloadedError, LLMRequestTimeoutError, get_llm_scheduler
+from utils.helpers import print_history, add_history, format_docs, render_assistant_message, stream_llm_response, record_stream_stats
+from utils.data_loader import embed_files
+from config.settings import settings
+from ui.components import render_latency_dashboard
 
 # 페이지 설정
 st.set_page_config(
@@ -49,10 +53,15 @@ if "messages" not in st.session_state:
     st.session_state["messages"] = []
 if "search_history" not in st.session_state:
     st.session_state["search_history"] = []
+if "session_id" not in st.session_state:
+    # LLM 스케줄러의 세션별 공정 분배 기준
+    st.session_state["session_id"] = uuid.uuid4().hex
 if "system_stats" not in st.session_state:
     st.session_state["system_stats"] = {
         "total_searches": 0,
-        "avg_response_time": 0.0,
+        "avg_ttft": 0.0,
+        "avg_tokens_per_sec": 0.0,
+        "streamed_responses": 0,
         "datasets_used": set()
     }
 
@@ -100,7 +109,8 @@ with st.sidebar:
             
             # 고급 설정
             with st.expander("⚙️ 고급 설정"):
-                top_k = st.slider("검색 결과 개수", 1, 20, 5)
+                search_settings = settings.get_search_settings()
+                top_k = st.slider("검색 결과 개수", 1, search_settings["max_top_k"], search_settings["default_top_k"])
                 confidence_threshold = st.slider("신뢰도 임계값", 0.1, 1.0, 0.7, 0.1)
                 
         else:
@@ -123,8 +133,7 @@ with st.sidebar:
         retriever = None
         if files:
             st.markdown(f'<div class="status-success">✅ {len(files)}개 파일 업로드됨</div>', unsafe_allow_html=True)
-            retrievers = [embed_file(f) for f in files]
-            retriever = EnsembleRetriever(retrievers=retrievers)
+            retriever = embed_files(files)
             
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -139,10 +148,13 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
     
+    # 단계별 지연시간 (p50/p95/p99, 모든 세션/프로세스 합산)
+    render_latency_dashboard()
+    
     st.markdown(f"""
     <div class="metric-card">
-        <h3>{stats['avg_response_time']:.2f}s</h3>
-        <p>평균 응답 시간</p>
+        <h3>{stats.get('avg_ttft', 0.0):.2f}s / {stats.get('avg_tokens_per_sec', 0.0):.1f}</h3>
+        <p>평균 첫 토큰 시간 / 생성 속도 (tokens/s)</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -152,10 +164,41 @@ with st.sidebar:
         <p>사용된 데이터셋</p>
     </div>
     """, unsafe_allow_html=True)
+    
+    if doc_source == "🗂️ 다중 데이터셋" and available_datasets:
+        cache_stats = multi_retriever.query_cache.get_stats()
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>{cache_stats['hit_rate']:.0%}</h3>
+            <p>질의 임베딩 캐시 적중률 ({cache_stats['hits'] + cache_stats['disk_hits']}/{cache_stats['hits'] + cache_stats['disk_hits'] + cache_stats['misses']})</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    answer_cache_stats = load_answer_cache().get_stats()
+    st.markdown(f"""
+    <div class="metric-card">
+        <h3>{answer_cache_stats['hit_rate']:.0%}</h3>
+        <p>응답 캐시 적중률 ({answer_cache_stats['hits']}/{answer_cache_stats['hits'] + answer_cache_stats['misses']})</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    scheduler_stats = get_llm_scheduler().get_stats()
+    st.markdown(f"""
+    <div class="metric-card">
+        <h3>{scheduler_stats['queue_depth']} / {scheduler_stats['active']}</h3>
+        <p>LLM 대기 / 실행 중 (평균 대기 {scheduler_stats['avg_wait']:.2f}s, p95 {scheduler_stats['p95_wait']:.2f}s, 거절 {scheduler_stats['shed']})</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+# 첫 질문이 모델 로드 시간을 기다리지 않도록 백그라운드에서 미리 로드 (프로세스당 한 번)
+warmup_llm()
 
 # 프롬프트 빌더 초기화
 prompt_builder = AdvancedPromptBuilder()
 
+# 세션 간 공유되는 LLM 응답 캐시
+answer_cache = load_answer_cache()
+
 # 메인 채팅 영역
 st.markdown("### 🚀 AI 운동 프로그램 어시스턴트에 오신 것을 환영합니다!")
 
@@ -211,72 +254,78 @@ if user_input:
     </div>
     """, unsafe_allow_html=True)
     
+    # AI 응답 말풍선 자리 (스트리밍 시 토큰이 도착하는 대로 채움)
+    answer_placeholder = st.empty()
+    
     # AI 응답 생성
     with st.spinner("🤖 AI가 답변을 생성하고 있습니다..."):
-        # Ollama 연결 설정
-        ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        ollama = Ollama(model="eeve-korean-10-8b", base_url=ollama_base_url)
+        # 프로세스 공유 Ollama 클라이언트 (model 설정 사용)
+        llm_scheduler = get_llm_scheduler()
+        ollama = get_llm()
+        metrics = get_metrics()
         
-        if doc_source == "🗂️ 다중 데이터셋" and selected_datasets:
-            # 다중 데이터셋 검색
-            all_results = []
-            for dataset_name in selected_datasets:
-                results = multi_retriever.search_similar_docs(user_input, dataset_name, top_k)
-                for result in results:
-                    result['dataset'] = dataset_name
-                    all_results.append(result)
+        def generate_answer(prompt):
+            """LLM 답변 생성 - model.stream 설정 시 토큰 단위로 말풍선에 표시
             
-            # 유사도 기준으로 정렬
-            all_results.sort(key=lambda x: x['similarity'], reverse=True)
-            top_results = all_results[:top_k]
+            동시 호출 수는 스케줄러가 제한하며, 대기열이 가득 차면 LLMOverloadedError가 발생합니다.
+            스트리밍 중 performance.request_timeout이 지나 슬롯이 회수되면 LLMRequestTimeoutError로 중단합니다.
+            """
+            with llm_scheduler.slot(st.session_state["session_id"]) as ticket, metrics.span("llm_total"):
+                if not settings.get("model", "stream", True):
+                    return ollama.invoke(prompt)
+                answer, ttft, tokens_per_sec = stream_llm_response(
+                    ollama, prompt, answer_placeholder, should_stop=lambda: ticket.expired
+                )
+            if ticket.expired:
+                raise LLMRequestTimeoutError("LLM 요청 시간이 초과되었습니다.")
+            record_stream_stats(ttft, tokens_per_sec)
+            return answer
+        
+        def cached_answer(query_vector, doc_ids, template_version, prompt):
+            """응답 캐시에 없을 때만 LLM 호출 - 부하로 거절되면 대체 응답 (캐시에 저장하지 않음)"""
+            try:
+                return answer_cache.get_or_generate(
+                    query_vector, doc_ids, template_version, lambda: generate_answer(prompt)
+                )
+            except LLMOverloadedError:
+                return FALLBACK_RESPONSE
+        
+        if doc_source == "🗂️ 다중 데이터셋" and selected_datasets:
+            # 다중 데이터셋 동시 검색 - 검색 점수(hybrid 모드에서는 융합 점수) 상위 top_k개
+            top_results = multi_retriever.search_many(user_input, selected_datasets, top_k)
             
             if top_results:
                 # 컨텍스트 생성 - 운동 데이터를 더 명확하게 구조화
-                context_parts = []
-                for i, result in enumerate(top_results, 1):
-                    # full_data에서 운동 정보 추출
-                    full_data = result['full_data']
-                    exercise_info = f"""
-=== 운동 데이터 {i} (유사도: {result['similarity']:.3f}) ===
-운동명: {full_data.get('운동명', 'N/A')}
-목적: {full_data.get('목적', 'N/A')}
-설명: {full_data.get('설명', 'N/A')}
-체력 요소: {full_data.get('체력 요소', 'N/A')}
-운동 부위: {full_data.get('운동 부위', 'N/A')}
-도구: {full_data.get('도구', 'N/A')}
-제작연도: {full_data.get('제작연도', 'N/A')}
-영상 링크: {full_data.get('영상 링크', 'N/A')}
-"""
-                    context_parts.append(exercise_info)
+                with metrics.span("context_build"):
+                    context = prompt_builder.build_context(top_results)
                 
-                context = "\n\n".join(context_parts)
+                # 응답 캐시 키: 질의 임베딩 + 검색된 문서 ID + 프롬프트 템플릿 버전
+                query_vector = multi_retriever.embed_query(user_input)
+                doc_ids = [(r['dataset'], int(r['index'])) for r in top_results]
                 
                 # 평균 신뢰도 계산
                 avg_confidence = sum(r['similarity'] for r in top_results) / len(top_results)
                 
                 # 신뢰도가 낮으면 일반 대화 + RAG 정보 제공
                 if avg_confidence < 0.3:
-                    hybrid_prompt = f"""당신은 운동 전문 AI 어시스턴트입니다.
-사용자의 질문에 정확하고 도움이 되는 답변을 제공하세요.
-
-다음은 관련될 수 있는 참고 정보입니다 (신뢰도가 낮아 참고용으로만 활용):
-{context}
-
-사용자 질문: {user_input}
-
-답변 (운동 관련 질문인 경우 4개 운동 프로그램 형태로, 일반 질문인 경우 자연스럽게 대화):"""
-                    answer = ollama.invoke(hybrid_prompt)
+                    with metrics.span("prompt_build"):
+                        hybrid_prompt = prompt_builder.build_low_confidence_prompt(context, user_input)
+                    answer = cached_answer(
+                        query_vector, doc_ids, f"{prompt_builder.TEMPLATE_VERSION}:low_confidence", hybrid_prompt
+                    )
                 else:
                     # 프롬프트 생성
-                    rag_prompt = prompt_builder.build_rag_prompt(
-                        context=context,
-                        question=user_input,
-                        data_types=selected_datasets,
-                        confidence_threshold=confidence_threshold
-                    )
+                    with metrics.span("prompt_build"):
+                        rag_prompt = prompt_builder.build_rag_prompt(
+                            context=context,
+                            question=user_input,
+                            data_types=selected_datasets,
+                            confidence_threshold=confidence_threshold
+                        )
                     
                     # 답변 생성
-                    answer = ollama.invoke(rag_prompt)
+                    template_version = f"{prompt_builder.TEMPLATE_VERSION}:rag:{confidence_threshold}:{','.join(selected_datasets)}"
+                    answer = cached_answer(query_vector, doc_ids, template_version, rag_prompt)
                 
                 # 검색 결과 표시
                 with st.expander("🔍 검색된 문서 정보"):
@@ -289,66 +338,45 @@ if user_input:
                         """, unsafe_allow_html=True)
                 
                 # 통계 업데이트
-                response_time = time.time() - start_time
+                metrics.observe("request_total", time.time() - start_time)
                 st.session_state["system_stats"]["total_searches"] += 1
                 st.session_state["system_stats"]["datasets_used"].update(selected_datasets)
                 
-                # 평균 응답 시간 업데이트
-                current_avg = st.session_state["system_stats"]["avg_response_time"]
-                total_searches = st.session_state["system_stats"]["total_searches"]
-                new_avg = (current_avg * (total_searches - 1) + response_time) / total_searches
-                st.session_state["system_stats"]["avg_response_time"] = new_avg
-                
             else:
                 # RAG 검색 실패 시 일반 대화 모드로 전환
-                general_prompt = f"""당신은 운동 전문 AI 어시스턴트입니다.
-사용자의 질문에 정확하고 도움이 되는 답변을 제공하세요.
-
-운동 관련 질문인 경우:
-- 4개 운동 프로그램 형태로 답변
-- 목적에 맞는 구체적인 운동 추천
-- 각 운동별 상세 설명 제공
-
-일반 질문인 경우:
-- 친근하고 자연스럽게 대화
-
-사용자 질문: {user_input}
-
-답변:"""
+                with metrics.span("prompt_build"):
+                    general_prompt = prompt_builder.build_general_prompt(user_input)
                 
-                answer = ollama.invoke(general_prompt)
+                answer = cached_answer(
+                    multi_retriever.embed_query(user_input), [], f"{prompt_builder.TEMPLATE_VERSION}:general",
+                    general_prompt
+                )
                 
                 # 통계 업데이트
-                response_time = time.time() - start_time
+                metrics.observe("request_total", time.time() - start_time)
                 st.session_state["system_stats"]["total_searches"] += 1
                 
-                current_avg = st.session_state["system_stats"]["avg_response_time"]
-                total_searches = st.session_state["system_stats"]["total_searches"]
-                new_avg = (current_avg * (total_searches - 1) + response_time) / total_searches
-                st.session_state["system_stats"]["avg_response_time"] = new_avg
-                
         elif doc_source == "📁 파일 업로드" and retriever:
             # 파일 업로드 방식
-            retrieved_docs = retriever.invoke(user_input)
-            context = format_docs(retrieved_docs)
+            with metrics.span("retrieval"):
+                retrieved_docs = retriever.invoke(user_input)
+            with metrics.span("context_build"):
+                context = format_docs(retrieved_docs)
             
-            rag_prompt = prompt_builder.build_rag_prompt(
-                context=context,
-                question=user_input,
-                data_types=["업로드된 파일"]
-            )
+            with metrics.span("prompt_build"):
+                rag_prompt = prompt_builder.build_rag_prompt(
+                    context=context,
+                    question=user_input,
+                    data_types=["업로드된 파일"]
+                )
             
-            answer = ollama.invoke(rag_prompt)
+            # 업로드 문서는 질의 임베딩 없이 호출하므로 응답 캐시를 사용하지 않음
+            answer = cached_answer(None, [], "", rag_prompt)
             
             # 통계 업데이트
-            response_time = time.time() - start_time
+            metrics.observe("request_total", time.time() - start_time)
             st.session_state["system_stats"]["total_searches"] += 1
             
-            current_avg = st.session_state["system_stats"]["avg_response_time"]
-            total_searches = st.session_state["system_stats"]["total_searches"]
-            new_avg = (current_avg * (total_searches - 1) + response_time) / total_searches
-            st.session_state["system_stats"]["avg_response_time"] = new_avg
-            
         else:
             # 일반 질문 (데이터 없이)
             if doc_source == "🗂️ 다중 데이터셋":
@@ -356,18 +384,8 @@ if user_input:
             else:
                 answer = "❌ 파일을 업로드해주세요."
         
-        # AI 응답 표시
-        st.markdown(f"""
-        <div style="background: #f8f9fa; 
-                   padding: 1.5rem; border-radius: 15px; 
-                   margin: 0.5rem 0; margin-right: 20%;
-                   border-left: 5px solid #3498db;
-                   box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-                   color: #2c3e50;">
-            <strong style="color: #3498db; font-size: 1.1em;">🤖 AI 어시스턴트:</strong><br><br>
-            <div style="line-height: 1.6; color: #2c3e50;">{answer}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        # AI 응답 표시 (캐시 적중 또는 비스트리밍 응답 포함)
+        answer_placeholder.markdown(render_assistant_message(answer), unsafe_allow_html=True)
         
         add_history("assistant", answer)
         
@@ -1,12 +1,25 @@
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+import json
+import time
+from typing import AsyncIterator, List, Optional, Union
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Union
 from pydantic import BaseModel, Field
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langserve import add_routes
 from chain import chain as prompt_chain
 from chat import chain as chat_chain
+from config.settings import settings
+from core.llm import warmup_llm
+from core.metrics import get_metrics
+from core.llm_scheduler import (
+    FALLBACK_RESPONSE, PRIORITY_INTERACTIVE, LLMOverloadedError, LLMRequestTimeoutError, get_llm_scheduler,
+)
+from core.prompt_builder import AdvancedPromptBuilder
+from core.retriever import create_retriever
 import uvicorn
 
 app = FastAPI()
@@ -40,5 +53,176 @@ add_routes(
     playground_type="chat",
 )
 
+# RAG 엔드포인트 → /rag
+# 검색(임베딩/행렬곱)은 스레드 풀에서 실행하고, Ollama 호출은 프로세스 공유 비동기 클라이언트의
+# 연결 풀(keep-alive)을 재사용하므로 한 프로세스에서 여러 API 클라이언트를 동시에 처리합니다.
+rag_state = {}
+prompt_builder = AdvancedPromptBuilder()
+
+
+class RagRequest(BaseModel):
+    question: str = Field(..., min_length=1)
+    datasets: Optional[List[str]] = None  # 지정하지 않으면 로드된 모든 데이터셋
+    top_k: Optional[int] = Field(None, ge=1)  # search.max_top_k로 제한 (Streamlit 슬라이더와 같은 상한)
+    confidence_threshold: float = 0.7
+    stream: bool = True
+    session_id: Optional[str] = None  # LLM 대기열 공정 분배 기준 (없으면 클라이언트 주소)
+    priority: int = PRIORITY_INTERACTIVE  # 작을수록 먼저 처리
+
+
+@app.on_event("startup")
+async def startup_rag():
+    performance_settings = settings.get_performance_settings()
+    rag_state["http"] = httpx.AsyncClient(
+        base_url=settings.get("model", "base_url", "http://localhost:11434"),
+        timeout=httpx.Timeout(performance_settings.get("request_timeout", 30), connect=5.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    warmup_llm()
+    # 데이터셋 로드와 임베딩 모델 워밍업은 이벤트 루프를 막지 않도록 스레드에서 실행
+    rag_state["retriever"], rag_state["datasets"] = await run_in_threadpool(create_retriever)
+
+
+@app.on_event("shutdown")
+async def shutdown_rag():
+    if "http" in rag_state:
+        await rag_state["http"].aclose()
+
+
+def build_rag_prompt(request: RagRequest, results) -> str:
+    """검색 결과에 따라 main.py와 같은 기준으로 프롬프트를 고르는 함수"""
+    metrics = get_metrics()
+    if not results:
+        with metrics.span("prompt_build"):
+            return prompt_builder.build_general_prompt(request.question)
+
+    with metrics.span("context_build"):
+        context = prompt_builder.build_context(results)
+    avg_confidence = sum(r['similarity'] for r in results) / len(results)
+    with metrics.span("prompt_build"):
+        if avg_confidence < 0.3:
+            return prompt_builder.build_low_confidence_prompt(context, request.question)
+        return prompt_builder.build_rag_prompt(
+            context=context,
+            question=request.question,
+            data_types=request.datasets or rag_state["datasets"],
+            confidence_threshold=request.confidence_threshold,
+        )
+
+
+async def stream_ollama(prompt: str) -> AsyncIterator[str]:
+    """Ollama /api/generate 스트리밍 응답에서 토큰을 순서대로 내보내는 함수 (TTFT/전체 시간 기록)"""
+    metrics = get_metrics()
+    start_time = time.perf_counter()
+    first_token = True
+    model_settings = settings.get_model_settings()
+    payload = {
+        "model": model_settings.get("ollama_model", "eeve-korean-10-8b"),
+        "prompt": prompt,
+        "stream": True,
+        "keep_alive": model_settings.get("keep_alive", "30m"),
+        "options": {
+            "temperature": model_settings.get("temperature", 0.7),
+            "top_p": model_settings.get("top_p", 0.9),
+            "top_k": model_settings.get("top_k", 40),
+            "num_predict": model_settings.get("max_tokens", 2048),
+        },
+    }
+    async with rag_state["http"].stream("POST", "/api/generate", json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                if first_token:
+                    metrics.observe("llm_ttft", time.perf_counter() - start_time)
+                    first_token = False
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+    metrics.observe("llm_total", time.perf_counter() - start_time)
+
+
+async def stream_within_slot(prompt: str, ticket) -> AsyncIterator[str]:
+    """스케줄러가 request_timeout으로 슬롯을 회수하면 생성을 중단하는 stream_ollama"""
+    async for token in stream_ollama(prompt):
+        if ticket.expired:
+            raise LLMRequestTimeoutError("LLM 요청 시간이 초과되었습니다.")
+        yield token
+
+
+def _source(result) -> dict:
+    return {
+        "dataset": result['dataset'],
+        "index": result['index'],
+        "similarity": result['similarity'],
+        "score": result['score'],
+        "content": result['content'],
+    }
+
+
+@app.post("/rag")
+async def rag(request: RagRequest, http_request: Request):
+    """데이터셋 검색 → 프롬프트 생성 → Ollama 답변 생성
+
+    stream=True면 NDJSON으로 {"type": "sources"}, {"type": "token"}..., {"type": "done"}을 순서대로 보냅니다.
+    LLM 대기열이 가득 차면 stream=True는 {"type": "fallback"} 이벤트, stream=False는 503 응답으로 대체 답변을 보냅니다.
+    """
+    start_time = time.perf_counter()
+    retriever = rag_state.get("retriever")
+    if retriever is None:
+        raise HTTPException(status_code=503, detail="데이터셋이 아직 로드되지 않았습니다.")
+
+    datasets = request.datasets or rag_state["datasets"]
+    search_settings = settings.get_search_settings()
+    top_k = min(request.top_k or search_settings.get("default_top_k", 4), search_settings.get("max_top_k", 20))
+    results = await run_in_threadpool(retriever.search_many, request.question, datasets, top_k)
+    prompt = build_rag_prompt(request, results)
+    sources = [_source(result) for result in results]
+    scheduler = get_llm_scheduler()
+    session_id = request.session_id or (http_request.client.host if http_request.client else "anonymous")
+
+    if not request.stream:
+        try:
+            async with scheduler.async_slot(session_id, request.priority) as ticket:
+                answer = "".join([token async for token in stream_within_slot(prompt, ticket)])
+            get_metrics().observe("request_total", time.perf_counter() - start_time)
+        except LLMOverloadedError:
+            return JSONResponse(status_code=503, content={"answer": FALLBACK_RESPONSE, "sources": sources, "fallback": True})
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"LLM 호출 실패: {e}")
+        return {"answer": answer, "sources": sources}
+
+    async def events():
+        yield json.dumps({"type": "sources", "sources": sources}, ensure_ascii=False) + "\n"
+        try:
+            async with scheduler.async_slot(session_id, request.priority) as ticket:
+                async for token in stream_within_slot(prompt, ticket):
+                    yield json.dumps({"type": "token", "content": token}, ensure_ascii=False) + "\n"
+        except LLMOverloadedError:
+            yield json.dumps({"type": "fallback", "content": FALLBACK_RESPONSE}, ensure_ascii=False) + "\n"
+            return
+        except httpx.HTTPError as e:
+            yield json.dumps({"type": "error", "detail": f"LLM 호출 실패: {e}"}, ensure_ascii=False) + "\n"
+            return
+        get_metrics().observe("request_total", time.perf_counter() - start_time)
+        yield json.dumps({"type": "done"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """단계별 지연시간 히스토그램 (Prometheus 텍스트 형식, Streamlit 등 다른 프로세스 스냅샷 포함)"""
+    return PlainTextResponse(get_metrics().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/rag/stats")
+async def rag_stats():
+    """LLM 대기열 길이/대기 시간 통계"""
+    return get_llm_scheduler().get_stats()
+
+
 if __name__ == "__main__":
     uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,5 +1,8 @@
+import pandas as pd
 import streamlit as st
 
+from core.metrics import STAGES, get_metrics, summarize
+
 def render_header():
     """헤더 컴포넌트 렌더링"""
     st.markdown("""
@@ -44,7 +47,7 @@ def render_metrics():
         """, unsafe_allow_html=True)
     
     with col2:
-        avg_time = st.session_state["system_stats"]["avg_response_time"]
+        avg_time = summarize(get_metrics().collect()).get("request_total", {}).get("avg", 0.0)
         st.markdown(f"""
         <div class="metric-card">
             <h3>⏱️ {avg_time:.1f}s</h3>
@@ -61,6 +64,24 @@ def render_metrics():
         </div>
         """, unsafe_allow_html=True)
 
+def render_latency_dashboard():
+    """단계별 지연시간 대시보드 렌더링 (모든 프로세스 합산, 단위 ms)"""
+    summary = summarize(get_metrics().collect())
+    rows = [
+        {
+            "단계": label,
+            "횟수": summary[stage]["count"],
+            "p50": round(summary[stage]["p50"] * 1000, 1),
+            "p95": round(summary[stage]["p95"] * 1000, 1),
+            "p99": round(summary[stage]["p99"] * 1000, 1),
+        }
+        for stage, label in STAGES.items() if stage in summary
+    ]
+    if not rows:
+        st.caption("아직 측정된 요청이 없습니다.")
+        return
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
 def render_sidebar():
     """사이드바 컴포넌트 렌더링"""
     with st.sidebar:
@@ -1,16 +1,24 @@
+import hashlib
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import streamlit as st
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-# For embed_file utility
+# For embed_files utility
 from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.embeddings import CacheBackedEmbeddings
 from langchain.storage import LocalFileStore
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from core.embedding_service import get_embedding_service
+from core.lexical_index import BM25Index
 
 class DataLoader:
     """데이터 로딩 및 관리를 담당하는 클래스"""
@@ -40,7 +48,8 @@ class DataLoader:
         try:
             full_path = self.data_dir / file_path
             if full_path.exists():
-                embeddings = np.load(full_path)
+                # 복사 없이 mmap으로 로드 (여러 프로세스가 같은 페이지 캐시를 공유)
+                embeddings = np.load(full_path, mmap_mode='r')
                 st.success(f"✅ {file_path} 로드 완료 (차원: {embeddings.shape})")
                 return embeddings
             else:
@@ -67,11 +76,16 @@ class DataLoader:
             embeddings = self.load_embeddings(embeddings_npy)
             
             # 데이터셋 저장
+            text_column = 'text'
             self.datasets[name] = {
                 'text_df': text_df,
                 'full_df': full_df,
+                # 검색 결과를 pandas 행 접근 없이 O(k)로 만들기 위해 로드 시 한 번 변환
+                'texts': text_df[text_column].tolist(),
+                'records': full_df.to_dict('records'),
                 'embeddings': embeddings,
-                'text_column': 'text',
+                'lexical_index': BM25Index().build(text_df[text_column]),
+                'text_column': text_column,
                 'use_embeddings': embeddings is not None
             }
             
@@ -137,7 +151,6 @@ class DataLoader:
         
         dataset = self.datasets[name]
         text_df = dataset['text_df']
-        full_df = dataset['full_df']
         
         # 랜덤 샘플 선택
         sample_indices = np.random.choice(len(text_df), min(n_samples, len(text_df)), replace=False)
@@ -145,8 +158,8 @@ class DataLoader:
         samples = []
         for idx in sample_indices:
             sample = {
-                'text': text_df.iloc[idx][dataset['text_column']],
-                'full_data': full_df.iloc[idx].to_dict(),
+                'text': dataset['texts'][idx],
+                'full_data': dict(dataset['records'][idx]),
                 'index': idx
             }
             samples.append(sample)
@@ -163,64 +176,150 @@ class DataLoader:
             return []
         
         dataset = self.datasets[name]
-        text_df = dataset['text_df']
-        full_df = dataset['full_df']
         
-        query_lower = query.lower()
-        results = []
+        scores, top_indices = dataset['lexical_index'].search(query, top_k)
         
-        for idx, row in text_df.iterrows():
-            text_content = row[dataset['text_column']]
-            text_lower = text_content.lower()
-            
-            # 키워드 매칭 점수 계산
-            score = 0
-            for word in query_lower.split():
-                if word in text_lower:
-                    score += 1
-            
-            if score > 0:
-                results.append({
-                    'content': text_content,
-                    'similarity': score / len(query_lower.split()),  # 정규화된 점수
-                    'full_data': full_df.iloc[idx].to_dict(),
-                    'index': idx
-                })
+        results = []
+        for score, idx in zip(scores, top_indices):
+            results.append({
+                'content': dataset['texts'][idx],
+                'similarity': float(score),  # 정규화된 BM25 점수
+                'full_data': dict(dataset['records'][idx]),
+                'index': int(idx)
+            })
         
-        # 점수 기준으로 정렬
-        results.sort(key=lambda x: x['similarity'], reverse=True)
-        return results[:top_k]
+        return results
+
+
+FILE_INDEX_DIR = Path("./cache/indexes")
+FILE_SAVE_DIR = Path("./cache/files")
+
+
+def _file_hash(content: bytes) -> str:
+    """업로드 파일 내용의 SHA-256 해시를 반환하는 함수"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def _split_file(file_path: str) -> List[Document]:
+    """파일 하나를 파싱/분할하는 함수 (프로세스 풀 워커에서 실행)"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50,
+        separators=["\n\n", "\n", r"(?<=\.)", " ", ""],
+        length_function=len,
+    )
+    loader = UnstructuredFileLoader(file_path)
+    return loader.load_and_split(text_splitter=text_splitter)
+
 
+def _split_files(file_paths: List[str]) -> List[List[Document]]:
+    """여러 파일을 프로세스 풀에서 병렬로 파싱/분할하는 함수 (입력 순서 유지)"""
+    if len(file_paths) <= 1:
+        return [_split_file(path) for path in file_paths]
+    workers = min(len(file_paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as executor:
+        return list(executor.map(_split_file, file_paths))
 
-def embed_file(file):
-    """업로드 파일을 분할/임베딩해 FAISS 리트리버를 반환합니다."""
-    with st.spinner(f"📄 {getattr(file, 'name', 'uploaded')} 처리 중..."):
-        # 저장 및 경로 준비
-        save_dir = Path("./cache/files")
+
+def _build_file_vectorstores(files: List[Tuple[str, str, bytes]]) -> Dict[str, FAISS]:
+    """(해시, 파일명, 내용) 목록을 파일별 FAISS 벡터스토어로 만드는 함수
+    
+    ./cache/indexes/<해시>에 저장된 인덱스는 그대로 읽고, 나머지 파일만
+    병렬로 파싱/분할한 뒤 모든 청크를 한 번의 배치 임베딩으로 처리합니다.
+    """
+    embeddings = get_embedding_service()
+    cached_embeddings = CacheBackedEmbeddings.from_bytes_store(
+        embeddings, LocalFileStore("./.cache/embeddings"), namespace=embeddings.namespace
+    )
+
+    stores: Dict[str, FAISS] = {}
+    missing = []
+    for file_hash, file_name, content in files:
+        index_dir = FILE_INDEX_DIR / file_hash
+        if (index_dir / "index.faiss").exists():
+            try:
+                stores[file_hash] = FAISS.load_local(
+                    str(index_dir), cached_embeddings, allow_dangerous_deserialization=True
+                )
+                continue
+            except Exception:
+                pass
+        # 로더가 확장자로 형식을 판별하므로 원래 파일명 유지
+        save_dir = FILE_SAVE_DIR / file_hash
         save_dir.mkdir(parents=True, exist_ok=True)
-        file_name = getattr(file, 'name', 'uploaded_file')
         file_path = save_dir / file_name
-        # 파일 저장
-        content = file.read()
         with open(file_path, "wb") as f_out:
             f_out.write(content)
+        missing.append((file_hash, str(file_path)))
+
+    if not missing:
+        return stores
 
-        # 문서 로드/분할
-        cache_dir = LocalFileStore(f"./.cache/embeddings/{file_name}")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            separators=["\n\n", "\n", r"(?<=\.)", " ", ""],
-            length_function=len,
+    split_docs = _split_files([file_path for _, file_path in missing])
+
+    # 모든 파일의 청크를 한 번에 임베딩해 모델 배치를 최대한 채움
+    all_texts = [doc.page_content for docs in split_docs for doc in docs]
+    all_vectors = cached_embeddings.embed_documents(all_texts) if all_texts else []
+
+    offset = 0
+    for (file_hash, _), docs in zip(missing, split_docs):
+        if not docs:
+            continue
+        vectors = all_vectors[offset:offset + len(docs)]
+        offset += len(docs)
+        store = FAISS.from_embeddings(
+            list(zip([doc.page_content for doc in docs], vectors)),
+            cached_embeddings,
+            metadatas=[doc.metadata for doc in docs],
         )
-        loader = UnstructuredFileLoader(str(file_path))
-        docs = loader.load_and_split(text_splitter=text_splitter)
+        store.save_local(str(FILE_INDEX_DIR / file_hash))
+        stores[file_hash] = store
+    return stores
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _load_merged_vectorstore(file_hashes: Tuple[str, ...], _files: List[Tuple[str, str, bytes]]) -> Optional[FAISS]:
+    """업로드 파일 조합별로 하나로 병합된 FAISS 벡터스토어를 반환하는 함수 (세션/재실행 간 캐시됨)
+    
+    파일별 인덱스는 내용 해시로 디스크에 저장되므로, 파일을 하나 추가하면 그 파일만 새로 임베딩합니다.
+    """
+    stores = _build_file_vectorstores(_files)
+    merged = None
+    for file_hash in file_hashes:
+        store = stores.get(file_hash)
+        if store is None:
+            continue
+        if merged is None:
+            merged = store
+        else:
+            merged.merge_from(store)
+    return merged
+
+
+def embed_files(files) -> Optional[VectorStoreRetriever]:
+    """업로드 파일들을 하나의 FAISS 인덱스로 병합해 리트리버를 반환합니다 (추출된 텍스트가 없으면 None).
+    
+    파일 조합의 내용 해시로 캐시되므로 재실행(메시지 전송) 시에는 다시 만들지 않습니다.
+    """
+    entries = {}
+    for file in files:
+        content = file.getvalue()
+        # 같은 내용의 파일은 한 번만 처리
+        entries.setdefault(_file_hash(content), (getattr(file, 'name', 'uploaded_file'), content))
+    if not entries:
+        return None
+
+    file_hashes = tuple(sorted(entries))
+    with st.spinner(f"📄 파일 {len(entries)}개 처리 중..."):
+        vectorstore = _load_merged_vectorstore(
+            file_hashes, [(file_hash, *entries[file_hash]) for file_hash in file_hashes]
+        )
+    return vectorstore.as_retriever() if vectorstore is not None else None
+
 
-        # 임베딩/벡터스토어
-        embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
-        cached_embeddings = CacheBackedEmbeddings.from_bytes_store(embeddings, cache_dir)
-        vectorstore = FAISS.from_documents(docs, cached_embeddings)
-        return vectorstore.as_retriever()
+def embed_file(file) -> Optional[VectorStoreRetriever]:
+    """업로드 파일 하나를 분할/임베딩해 FAISS 리트리버를 반환합니다."""
+    return embed_files([file])
 
 @st.cache_resource(show_spinner=False)
 def create_data_loader() -> DataLoader:
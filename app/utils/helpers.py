@@ -1,5 +1,9 @@
+import time
+
 import streamlit as st
 
+from core.metrics import get_metrics
+
 def print_history():
     """대화 기록 표시 (향상된 스타일)"""
     st.markdown('<div class="chat-container">', unsafe_allow_html=True)
@@ -24,4 +28,64 @@ def add_history(role, content):
     st.session_state["messages"].append({"role": role, "content": content})
 
 def format_docs(docs):
-    return "\n\n".join(doc.page_content for doc in docs) 
\ No newline at end of file
+    return "\n\n".join(doc.page_content for doc in docs) 
+
+def render_assistant_message(answer):
+    """AI 응답 말풍선 HTML을 생성하는 함수"""
+    return f"""
+        <div style="background: #f8f9fa; 
+                   padding: 1.5rem; border-radius: 15px; 
+                   margin: 0.5rem 0; margin-right: 20%;
+                   border-left: 5px solid #3498db;
+                   box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+                   color: #2c3e50;">
+            <strong style="color: #3498db; font-size: 1.1em;">🤖 AI 어시스턴트:</strong><br><br>
+            <div style="line-height: 1.6; color: #2c3e50;">{answer}</div>
+        </div>
+        """
+
+def stream_llm_response(llm, prompt, placeholder, should_stop=None, render_interval=0.05, render_chars=200):
+    """LLM 응답을 청크 단위로 받아 placeholder에 점진적으로 표시하는 함수
+    
+    반환값: (전체 답변, 첫 토큰까지 걸린 시간(초), 초당 토큰 수)
+    Ollama는 토큰마다 청크를 보내므로 청크 수를 토큰 수로 사용합니다.
+    should_stop()이 참이 되면 (스케줄러가 슬롯을 회수한 경우 등) 그때까지의 답변으로 중단합니다.
+    토큰마다 말풍선 전체를 다시 그리지 않도록, 첫 토큰 이후에는 render_interval초 또는
+    render_chars글자가 쌓일 때만 갱신하고 마지막에 전체 답변을 한 번 더 그립니다.
+    """
+    start_time = time.time()
+    first_token_time = None
+    chunks = []
+    last_render_time = 0.0
+    pending_chars = 0
+    
+    for chunk in llm.stream(prompt):
+        if should_stop is not None and should_stop():
+            break
+        now = time.time()
+        if first_token_time is None:
+            first_token_time = now
+        chunks.append(chunk)
+        pending_chars += len(chunk)
+        if now - last_render_time >= render_interval or pending_chars >= render_chars:
+            placeholder.markdown(render_assistant_message("".join(chunks) + "▌"), unsafe_allow_html=True)
+            last_render_time = now
+            pending_chars = 0
+    
+    end_time = time.time()
+    answer = "".join(chunks)
+    placeholder.markdown(render_assistant_message(answer), unsafe_allow_html=True)
+    
+    first_token_time = first_token_time or end_time
+    generation_time = end_time - first_token_time
+    tokens_per_sec = (len(chunks) - 1) / generation_time if len(chunks) > 1 and generation_time > 0 else 0.0
+    return answer, first_token_time - start_time, tokens_per_sec
+
+def record_stream_stats(ttft, tokens_per_sec):
+    """스트리밍 응답의 TTFT와 생성 속도를 세션 통계(평균)에 누적하고, TTFT는 단계별 메트릭에도 기록하는 함수"""
+    get_metrics().observe("llm_ttft", ttft)
+    stats = st.session_state["system_stats"]
+    count = stats.get("streamed_responses", 0) + 1
+    stats["streamed_responses"] = count
+    stats["avg_ttft"] = (stats.get("avg_ttft", 0.0) * (count - 1) + ttft) / count
+    stats["avg_tokens_per_sec"] = (stats.get("avg_tokens_per_sec", 0.0) * (count - 1) + tokens_per_sec) / count
@@ -0,0 +1,180 @@
+"""
+질문 분석기 마이크로벤치마크
+
+컴파일된 QuestionAnalyzer(범주마다 미리 컴파일한 정규식 하나)와
+이전 방식(호출마다 키워드 사전 생성, 키워드마다 부분 문자열 검색, 패턴마다 컴파일되지 않은 re.search)을
+같은 질문 세트로 비교합니다. 모든 질문에서 두 방식의 결과가 같은지 먼저 확인한 뒤
+함수별 호출당 평균 시간(µs)과 속도 향상 배수를 JSON으로 출력합니다.
+
+사용법:
+    python benchmark_question_analyzer.py --input ./data/text_ex.csv --questions 500 --repeat 20
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+
+from core.question_analyzer import (  # noqa: E402
+    BODY_PARTS, GOALS, NEGATIVE_WORDS, POSITIVE_WORDS, QUESTION_PATTERNS, STOP_WORDS, QuestionAnalyzer,
+)
+
+DEFAULT_QUESTIONS = [
+    "하체 근력을 키우는 운동 추천해줘",
+    "덤벨로 할 수 있는 어깨 운동",
+    "허리가 아플 때 피해야 할 자세",
+    "초보자를 위한 유연성 운동 방법을 자세히 알려주세요",
+    "무릎 관절에 문제가 있는데 어떤 운동이 좋아?",
+    "스트레칭은 언제까지 해야 효과가 있나요",
+    "운동할 때 주의할 점이 뭐야",
+    "하체력 기르기",
+    "오늘 날씨 어때",
+]
+
+
+# --- 이전 방식 (호출마다 사전/패턴 재구성) ---
+
+def legacy_extract_body_part_and_goal(question):
+    question_lower = question.lower()
+    body_parts = {part: list(keywords) for part, keywords in BODY_PARTS.items()}
+    detected_body_part = "전신"
+    for part, keywords in body_parts.items():
+        if any(keyword in question_lower for keyword in keywords):
+            detected_body_part = part
+            break
+    goals = {goal: list(keywords) for goal, keywords in GOALS.items()}
+    detected_goal = "기능 향상"
+    for goal, keywords in goals.items():
+        if any(keyword in question_lower for keyword in keywords):
+            detected_goal = goal
+            break
+    return detected_body_part, detected_goal
+
+
+def legacy_analyze_question_type(question):
+    q = question.lower()
+    patterns = {category: list(regex_list) for category, regex_list in QUESTION_PATTERNS.items()}
+    for category, regex_list in patterns.items():
+        for pattern in regex_list:
+            if re.search(pattern, q):
+                return category
+    return "기타 일반 문의"
+
+
+def legacy_analyze_sentiment(question):
+    question_lower = question.lower()
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in question_lower)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in question_lower)
+    if positive_count > negative_count:
+        return "긍정적"
+    elif negative_count > positive_count:
+        return "부정적"
+    return "중립적"
+
+
+def legacy_get_analysis_summary(question):
+    body_part, goal = legacy_extract_body_part_and_goal(question)
+    word_count = len(question.split())
+    return {
+        "body_part": body_part,
+        "goal": goal,
+        "question_type": legacy_analyze_question_type(question),
+        "complexity": "단순" if word_count <= 5 else "보통" if word_count <= 15 else "복잡",
+        "keywords": [word for word in question.lower().split() if word not in list(STOP_WORDS) and len(word) > 1],
+        "sentiment": legacy_analyze_sentiment(question),
+        "word_count": word_count,
+    }
+
+
+QUESTION_TEMPLATES = [
+    "{운동명} 하는 방법 알려줘",
+    "{운동 부위} 운동 추천해줘",
+    "{도구}로 할 수 있는 운동이 뭐야?",
+    "{운동명} 할 때 주의할 점은?",
+    "{체력 요소}을 기르려면 어떤 운동이 좋아?",
+    "{운동 부위}가 아플 때 {운동명} 해도 돼?",
+]
+
+
+def make_questions(texts, n_questions):
+    """문서의 운동명/부위/도구/체력 요소로 실제 질문과 비슷한 문장을 만드는 함수"""
+    questions = []
+    for i, text in enumerate(texts):
+        if len(questions) >= n_questions:
+            break
+        fields = {
+            key.replace("[공통] ", ""): value
+            for key, value in (line.split(": ", 1) for line in text.splitlines() if ": " in line)
+            if value != "정보 없음"
+        }
+        try:
+            questions.append(QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)].format(**fields))
+        except KeyError:
+            continue
+    return questions
+
+
+def time_per_call(function, questions, repeat, rounds=5) -> float:
+    """호출당 평균 시간(µs) - 다른 프로세스 영향을 줄이도록 rounds번 측정한 값 중 최솟값"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for question in questions:
+                function(question)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6 / (repeat * len(questions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="질문 분석기 마이크로벤치마크")
+    parser.add_argument("--input", default="./data/text_ex.csv", help="질문으로 쓸 text 컬럼 CSV (없으면 기본 질문만)")
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    questions = list(DEFAULT_QUESTIONS)
+    if Path(args.input).exists():
+        texts = pd.read_csv(args.input)['text'].dropna().astype(str).drop_duplicates()
+        questions += make_questions(texts, max(args.questions - len(questions), 0))
+
+    analyzer = QuestionAnalyzer()
+    cases = {
+        "extract_body_part_and_goal": (legacy_extract_body_part_and_goal, analyzer.extract_body_part_and_goal),
+        "analyze_question_type": (legacy_analyze_question_type, analyzer.analyze_question_type),
+        "analyze_sentiment": (legacy_analyze_sentiment, analyzer.analyze_sentiment),
+        "get_analysis_summary": (legacy_get_analysis_summary, analyzer.get_analysis_summary),
+    }
+
+    mismatches = [
+        {"function": name, "question": question}
+        for name, (legacy, compiled) in cases.items()
+        for question in questions
+        if legacy(question) != compiled(question)
+    ]
+    if mismatches:
+        print(json.dumps({"mismatches": mismatches[:20]}, ensure_ascii=False, indent=2))
+        sys.exit(1)
+
+    results = {}
+    for name, (legacy, compiled) in cases.items():
+        legacy_us = time_per_call(legacy, questions, args.repeat)
+        compiled_us = time_per_call(compiled, questions, args.repeat)
+        results[name] = {
+            "legacy_us": round(legacy_us, 2),
+            "compiled_us": round(compiled_us, 2),
+            "speedup": round(legacy_us / max(compiled_us, 1e-9), 2),
+        }
+
+    print(json.dumps({"questions": len(questions), "repeat": args.repeat, "identical_results": True,
+                      "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
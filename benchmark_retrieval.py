@@ -0,0 +1,322 @@
+"""
+검색 성능 벤치마크 리포트
+
+data/text_ex.csv(및 10배/100배로 늘린 합성 복제본)를 로드하고, 고정된 질의 세트를
+MultiDatasetRetriever.search_similar_docs로 검색 방식별(exact, ANN, exact+metadata 필터, keyword, hybrid)로 실행해
+정확 검색(exact) 대비 recall@k, 지연시간 분위수(p50/p95/p99), QPS, 인덱스 메모리, 빌드 시간을 JSON으로 출력합니다.
+검색 변경 전후로 실행해 결과를 비교하면 성능 회귀를 확인할 수 있습니다.
+
+합성 복제본은 원본 임베딩에 작은 잡음을 더해 다시 정규화하므로 정확 검색 순위가 동점 없이 정해집니다.
+100배 복제본은 임베딩만 원본의 100배 디스크를 사용하므로(bge-m3 기준 약 7GB) 필요할 때만 지정하세요.
+
+사용법:
+    python benchmark_retrieval.py --scales 1,10 --ann-index hnsw,ivf --top-k 10
+    python benchmark_retrieval.py --synthetic-queries --output ./cache/benchmark/report.json   # 임베딩 모델 없이 실행
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+
+from config.settings import settings  # noqa: E402
+
+# 벤치마크 결과가 앱의 지연시간 대시보드/질의 캐시에 섞이지 않도록 비활성화 (모듈 임포트 전에 설정)
+settings.set("performance", "metrics_dir", None)
+settings.set("performance", "enable_caching", False)
+# 기본 방식들은 전체 코퍼스 대상 결과를 비교하고, 메타데이터 필터는 별도 방식으로 측정
+settings.set("search", "metadata_filter", False)
+
+from core.embedding_service import get_embedding_service  # noqa: E402
+from core.lexical_index import BM25Index  # noqa: E402
+from core.metadata_index import MetadataIndex  # noqa: E402
+from core.retriever import MultiDatasetRetriever  # noqa: E402
+from core.vector_index import create_index  # noqa: E402
+from evaluate_quantization import recall_at_k  # noqa: E402
+
+DEFAULT_QUERIES = [
+    "하체 근력을 키우는 운동 추천해줘",
+    "덤벨로 할 수 있는 어깨 운동",
+    "허리가 아플 때 피해야 할 자세",
+    "초보자를 위한 유연성 운동",
+    "노인 낙상 예방을 위한 균형 운동",
+    "심폐지구력을 높이는 유산소 운동",
+    "밴드를 이용한 상체 운동",
+    "의자에 앉아서 할 수 있는 운동",
+]
+
+DATASET_NAME = "benchmark"
+CHUNK_SIZE = 65536
+
+
+def load_corpus(args):
+    """(본문 DataFrame, 전체 데이터 DataFrame, 원본 임베딩)을 반환하는 함수
+
+    임베딩 파일이 없으면 임베딩 서비스로 계산해 작업 디렉터리에 저장하고 다음 실행부터 재사용합니다.
+    """
+    text_df = pd.read_csv(args.text_csv)
+    full_df = pd.read_csv(args.full_csv) if Path(args.full_csv).exists() else text_df
+    if len(full_df) != len(text_df):
+        full_df = text_df
+
+    embeddings_path = Path(args.embeddings)
+    if not embeddings_path.exists():
+        embeddings_path = args.work_dir / "embeddings_x1.npy"
+        if not embeddings_path.exists():
+            vectors = get_embedding_service().embed_documents(text_df['text'].fillna("").astype(str).tolist())
+            np.save(embeddings_path, np.asarray(vectors, dtype=np.float32))
+    embeddings = np.load(embeddings_path, mmap_mode="r")
+    if len(embeddings) != len(text_df):
+        raise ValueError(f"임베딩 행 수({len(embeddings)})와 본문 행 수({len(text_df)})가 다릅니다: {embeddings_path}")
+    return text_df, full_df, embeddings
+
+
+def write_scaled_dataset(text_df, full_df, embeddings, scale, noise, seed, work_dir: Path):
+    """scale배로 늘린 CSV/임베딩 파일을 만들고 (text_csv, full_csv, embeddings_npy) 경로를 반환하는 함수
+
+    첫 번째 복제본은 원본 그대로, 나머지는 임베딩에 잡음을 더하고 본문에 복제 번호를 붙입니다.
+    같은 scale/seed의 파일이 이미 있으면 재사용합니다.
+    """
+    scale_dir = work_dir / f"x{scale}"
+    scale_dir.mkdir(parents=True, exist_ok=True)
+    text_csv, full_csv = scale_dir / "text.csv", scale_dir / "full.csv"
+    embeddings_npy = scale_dir / f"embeddings_seed{seed}.npy"
+    rows, dimension = embeddings.shape
+
+    if not text_csv.exists() or not full_csv.exists():
+        texts = text_df['text'].fillna("").astype(str)
+        pd.DataFrame({'text': pd.concat(
+            [texts] + [texts + f" (복제 {copy})" for copy in range(1, scale)], ignore_index=True
+        )}).to_csv(text_csv, index=False)
+        pd.concat([full_df] * scale, ignore_index=True).to_csv(full_csv, index=False)
+
+    if embeddings_npy.exists() and np.load(embeddings_npy, mmap_mode="r").shape == (rows * scale, dimension):
+        return text_csv, full_csv, embeddings_npy
+
+    # 100배 복제본도 메모리에 한 번에 올리지 않도록 청크 단위로 mmap 파일에 기록
+    output = np.lib.format.open_memmap(embeddings_npy, mode="w+", dtype=embeddings.dtype,
+                                       shape=(rows * scale, dimension))
+    rng = np.random.default_rng(seed)
+    for copy in range(scale):
+        for start in range(0, rows, CHUNK_SIZE):
+            chunk = np.asarray(embeddings[start:start + CHUNK_SIZE], dtype=np.float32)
+            if copy:
+                chunk = chunk + rng.normal(scale=noise, size=chunk.shape).astype(np.float32)
+                chunk /= np.maximum(np.linalg.norm(chunk, axis=1, keepdims=True), 1e-12)
+            offset = copy * rows + start
+            output[offset:offset + len(chunk)] = chunk.astype(embeddings.dtype)
+    output.flush()
+    del output
+    return text_csv, full_csv, embeddings_npy
+
+
+def make_query_set(text_df, embeddings, args):
+    """(질의 문장 목록, 질의 임베딩 배열)을 반환하는 함수
+
+    기본은 고정 질의 + 문서 앞부분을 임베딩 서비스로 임베딩하고,
+    --synthetic-queries면 모델 없이 문서 임베딩에 잡음을 더한 벡터와 해당 문서 앞부분을 사용합니다.
+    """
+    texts = text_df['text'].fillna("").astype(str).tolist()
+    rng = np.random.default_rng(args.seed)
+    if args.synthetic_queries:
+        rows = np.sort(rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False))
+        vectors = np.asarray(embeddings[rows], dtype=np.float32)
+        vectors += rng.normal(scale=args.noise, size=vectors.shape).astype(np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return [texts[row][:60] for row in rows], vectors
+
+    rows = rng.choice(len(texts), size=min(max(args.queries - len(DEFAULT_QUERIES), 0), len(texts)), replace=False)
+    queries = (DEFAULT_QUERIES + [texts[row][:60] for row in np.sort(rows)])[:args.queries]
+    service = get_embedding_service()
+    service.warmup()
+    return queries, np.asarray([service.embed_query(query) for query in queries], dtype=np.float32)
+
+
+def index_bytes(index, work_dir: Path) -> int:
+    """검색 인덱스가 차지하는 메모리(바이트)를 추정하는 함수"""
+    if isinstance(index, BM25Index):
+        return int(sum(ids.nbytes + weights.nbytes for ids, weights in index.postings.values()))
+    if isinstance(index, MetadataIndex):
+        return int(sum(rows.nbytes for postings in index.postings.values() for rows in postings.values()))
+    if getattr(index, "persistent", False):
+        # FAISS 인덱스는 직렬화 크기 = 메모리 크기 (재정렬용 원본 벡터는 mmap 공유이므로 제외)
+        path = work_dir / f"benchmark.{index.index_type}.faiss"
+        index.save(path)
+        size = path.stat().st_size
+        path.unlink()
+        return int(size)
+    inverse_norms = index.inverse_norms.nbytes if index.inverse_norms is not None else 0
+    return int(index.embeddings.nbytes + inverse_norms)
+
+
+def run_queries(retriever, queries, query_vectors, top_k, mode):
+    """질의 세트를 순서대로 실행해 (질의별 결과 행 번호, 질의별 지연시간(ms))를 반환하는 함수
+
+    strict=True로 검색하므로 임베딩/ANN 검색이 실패하면 키워드 검색 결과로 대체되지 않고 예외가 발생합니다.
+    """
+    # 첫 질의의 지연 로딩(mmap 페이지 등)이 분위수에 섞이지 않도록 한 번 미리 실행
+    retriever.search_similar_docs(queries[0], DATASET_NAME, top_k, mode, query_vectors[0], strict=True)
+
+    ids, latencies = [], []
+    for query, query_vector in zip(queries, query_vectors):
+        start = time.perf_counter()
+        results = retriever.search_similar_docs(query, DATASET_NAME, top_k, mode, query_vector, strict=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([result['index'] for result in results])
+    return ids, latencies
+
+
+def summarize_run(name, ids, latencies, reference_ids, build_seconds, memory_bytes):
+    latencies = np.asarray(latencies)
+    return {
+        "mode": name,
+        "recall_at_k": round(recall_at_k(reference_ids, ids), 4),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "p99": round(float(np.percentile(latencies, 99)), 3),
+        },
+        "qps": round(len(latencies) / max(latencies.sum() / 1000, 1e-9), 1),
+        "build_seconds": round(build_seconds, 3),
+        "index_bytes": memory_bytes,
+    }
+
+
+def benchmark_scale(scale, text_df, full_df, embeddings, queries, query_vectors, args):
+    text_csv, full_csv, embeddings_npy = write_scaled_dataset(
+        text_df, full_df, embeddings, scale, args.noise, args.seed, args.work_dir
+    )
+    search_settings = settings.get_search_settings()
+
+    # 로드 경로는 앱과 동일 (정확 검색 인덱스 + BM25 역색인)
+    settings.set("search", "index_type", "exact")
+    retriever = MultiDatasetRetriever()
+    start = time.perf_counter()
+    if not retriever.load_dataset(DATASET_NAME, str(text_csv), str(full_csv), str(embeddings_npy)):
+        raise RuntimeError(f"x{scale} 데이터셋 로드 실패")
+    load_seconds = time.perf_counter() - start
+    dataset = retriever.datasets[DATASET_NAME]
+    if not dataset['use_embeddings']:
+        raise RuntimeError(f"x{scale} 임베딩 파일을 읽지 못했습니다: {embeddings_npy}")
+    scaled_embeddings = dataset['embeddings']
+
+    # 빌드 시간은 인덱스별로 따로 측정
+    start = time.perf_counter()
+    exact_index = create_index("exact", search_settings)
+    exact_index.build(scaled_embeddings)
+    exact_build = time.perf_counter() - start
+    dataset['index'] = exact_index
+
+    start = time.perf_counter()
+    BM25Index().build(dataset['texts'])
+    lexical_build = time.perf_counter() - start
+
+    reference_ids, latencies = run_queries(retriever, queries, query_vectors, args.top_k, "dense")
+    results = [summarize_run("exact", reference_ids, latencies, reference_ids, exact_build,
+                             index_bytes(exact_index, args.work_dir))]
+
+    for index_type in args.ann_index:
+        start = time.perf_counter()
+        ann_index = create_index(index_type, search_settings)
+        ann_index.build(scaled_embeddings)
+        ann_build = time.perf_counter() - start
+        dataset['index'] = ann_index
+        ids, latencies = run_queries(retriever, queries, query_vectors, args.top_k, "dense")
+        results.append(summarize_run(f"ann:{index_type}", ids, latencies, reference_ids, ann_build,
+                                     index_bytes(ann_index, args.work_dir)))
+        dataset['index'] = exact_index
+        del ann_index
+
+    # 질문의 신체 부위/목표/도구로 후보를 좁힌 정확 검색 (recall은 필터로 제외된 문서만큼 낮아짐)
+    start = time.perf_counter()
+    metadata_index = MetadataIndex().build(dataset['full_df'])
+    metadata_build = time.perf_counter() - start
+    dataset['metadata_index'] = metadata_index
+    settings.set("search", "metadata_filter", True)
+    filtered = [metadata_index.candidates(metadata_index.extract_filters(query),
+                                          max(args.top_k, int(settings.get("search", "filter_min_candidates", 50))))
+                for query in queries]
+    ids, latencies = run_queries(retriever, queries, query_vectors, args.top_k, "dense")
+    settings.set("search", "metadata_filter", False)
+    result = summarize_run("exact+metadata", ids, latencies, reference_ids, exact_build + metadata_build,
+                           index_bytes(exact_index, args.work_dir) + index_bytes(metadata_index, args.work_dir))
+    result["filtered_queries"] = sum(rows is not None for rows in filtered)
+    result["avg_candidate_ratio"] = round(float(np.mean(
+        [len(rows) / len(scaled_embeddings) if rows is not None else 1.0 for rows in filtered]
+    )), 4)
+    results.append(result)
+
+    ids, latencies = run_queries(retriever, queries, query_vectors, args.top_k, "lexical")
+    results.append(summarize_run("keyword", ids, latencies, reference_ids, lexical_build,
+                                 index_bytes(dataset['lexical_index'], args.work_dir)))
+
+    ids, latencies = run_queries(retriever, queries, query_vectors, args.top_k, "hybrid")
+    results.append(summarize_run("hybrid", ids, latencies, reference_ids, exact_build + lexical_build,
+                                 index_bytes(exact_index, args.work_dir)
+                                 + index_bytes(dataset['lexical_index'], args.work_dir)))
+
+    return {
+        "scale": scale,
+        "rows": len(scaled_embeddings),
+        "dimension": int(scaled_embeddings.shape[1]),
+        "embeddings_bytes": int(scaled_embeddings.nbytes),
+        "load_seconds": round(load_seconds, 3),
+        # ru_maxrss는 리눅스에서 KB 단위
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 방식별 recall@k / 지연시간 / QPS 벤치마크")
+    parser.add_argument("--text-csv", default="./data/text_ex.csv")
+    parser.add_argument("--full-csv", default="./data/full_data_ex.csv")
+    parser.add_argument("--embeddings", default="./data/embeddings_ex.npy")
+    parser.add_argument("--work-dir", default="./cache/benchmark", help="복제 데이터셋/임베딩 저장 위치")
+    parser.add_argument("--scales", default="1,10,100", help="쉼표로 구분한 복제 배수")
+    parser.add_argument("--ann-index", default="hnsw", help="쉼표로 구분한 근사 인덱스 타입 (ivf, hnsw, sq8, pq 등)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--noise", type=float, default=0.02, help="복제본/합성 질의에 더할 잡음 크기")
+    parser.add_argument("--synthetic-queries", action="store_true", help="임베딩 모델 없이 문서 벡터로 질의 생성")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON 리포트를 저장할 파일 (지정하지 않으면 표준 출력만)")
+    args = parser.parse_args()
+    args.work_dir = Path(args.work_dir)
+    args.work_dir.mkdir(parents=True, exist_ok=True)
+    args.ann_index = [name for name in args.ann_index.split(",") if name]
+
+    text_df, full_df, embeddings = load_corpus(args)
+    queries, query_vectors = make_query_set(text_df, embeddings, args)
+
+    report = {
+        "text_csv": args.text_csv,
+        "top_k": args.top_k,
+        "queries": len(queries),
+        "query_source": "synthetic" if args.synthetic_queries else get_embedding_service().namespace,
+        "search_settings": {
+            key: settings.get("search", key)
+            for key in ("candidate_pool", "fusion", "rrf_k", "ivf_nlist", "ivf_nprobe", "hnsw_m", "hnsw_ef_search")
+        },
+        "scales": [
+            benchmark_scale(int(scale), text_df, full_df, embeddings, queries, query_vectors, args)
+            for scale in args.scales.split(",") if scale
+        ],
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+임베딩 백엔드 비교 리포트 (PyTorch vs ONNX Runtime)
+
+같은 문장을 두 백엔드로 임베딩해 벡터 간 코사인 유사도(일치도), 질의-문서 코사인 점수 차이,
+검색 결과 recall@k, 단건 질의 지연시간과 배치 처리량을 비교해 JSON으로 출력합니다.
+ONNX 모델이 없으면 embeddings.onnx_dir에 먼저 내보냅니다.
+문장별 코사인 최솟값이 --min-cosine보다 낮거나 recall@k가 --min-recall보다 낮으면 종료 코드 1로 끝납니다
+(같은 기준의 자동 테스트는 tests/test_embedding_parity.py).
+
+사용법:
+    python compare_embedding_backends.py --input ./data/text_ex.csv --docs 256 --queries 32
+    python compare_embedding_backends.py --quantize   # int8 동적 양자화 모델과 비교
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+
+from core.embedding_service import create_embedding_service  # noqa: E402
+from evaluate_quantization import recall_at_k  # noqa: E402
+
+# 일치도 기준 (fp32 ONNX는 같은 가중치이므로 거의 동일해야 하고, int8은 양자화 오차를 허용)
+MIN_COSINE = {"fp32": 0.999, "int8": 0.98}
+MIN_RECALL = {"fp32": 0.95, "int8": 0.8}
+
+DEFAULT_QUERIES = [
+    "하체 근력을 키우는 운동 추천해줘",
+    "덤벨로 할 수 있는 어깨 운동",
+    "허리가 아플 때 피해야 할 자세",
+    "초보자를 위한 유연성 운동",
+]
+
+
+def measure(service, documents, queries):
+    """(문서 벡터, 질의 벡터, 단건 질의 평균 지연(ms), 문서 처리량(docs/s))를 반환하는 함수"""
+    service.warmup()
+
+    start = time.perf_counter()
+    doc_vectors = np.asarray(service.embed_documents(documents), dtype=np.float32)
+    docs_per_sec = len(documents) / max(time.perf_counter() - start, 1e-9)
+
+    query_vectors, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(service.embed_query(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return doc_vectors, np.asarray(query_vectors, dtype=np.float32), float(np.mean(latencies)), docs_per_sec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 백엔드 일치도/지연시간 비교")
+    parser.add_argument("--input", default="./data/text_ex.csv", help="text 컬럼이 있는 CSV")
+    parser.add_argument("--docs", type=int, default=256, help="비교할 문서 수")
+    parser.add_argument("--queries", type=int, default=32, help="질의 수 (문서 앞부분 + 기본 질의)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--quantize", action="store_true", help="int8 동적 양자화 ONNX 모델 사용")
+    parser.add_argument("--min-cosine", type=float, help="문장별 벡터 코사인 최솟값 기준 (기본: fp32 0.999, int8 0.98)")
+    parser.add_argument("--min-recall", type=float, help="검색 결과 recall@k 기준 (기본: fp32 0.95, int8 0.8)")
+    args = parser.parse_args()
+    onnx_model = "int8" if args.quantize else "fp32"
+    min_cosine = MIN_COSINE[onnx_model] if args.min_cosine is None else args.min_cosine
+    min_recall = MIN_RECALL[onnx_model] if args.min_recall is None else args.min_recall
+
+    documents = pd.read_csv(args.input)['text'].fillna("").astype(str).tolist()[:args.docs]
+    queries = (DEFAULT_QUERIES + [doc[:60] for doc in documents])[:args.queries]
+
+    torch_service = create_embedding_service("torch")
+    onnx_service = create_embedding_service("onnx")
+    onnx_service.onnx_quantize = args.quantize
+
+    torch_docs, torch_queries, torch_latency, torch_throughput = measure(torch_service, documents, queries)
+    onnx_docs, onnx_queries, onnx_latency, onnx_throughput = measure(onnx_service, documents, queries)
+
+    # 같은 문장에 대한 두 백엔드 벡터의 코사인 유사도 (정규화된 벡터이므로 내적)
+    vector_cosine = np.concatenate([
+        np.sum(torch_docs * onnx_docs, axis=1),
+        np.sum(torch_queries * onnx_queries, axis=1),
+    ])
+    torch_scores = torch_queries @ torch_docs.T
+    onnx_scores = onnx_queries @ onnx_docs.T
+    top_k = min(args.top_k, len(documents))
+    recall = recall_at_k(
+        np.argsort(-torch_scores, axis=1)[:, :top_k].tolist(),
+        np.argsort(-onnx_scores, axis=1)[:, :top_k].tolist(),
+    )
+    passed = bool(vector_cosine.min() >= min_cosine and recall >= min_recall)
+
+    report = {
+        "documents": len(documents),
+        "queries": len(queries),
+        "onnx_model": onnx_model,
+        "parity": {
+            "vector_cosine_min": float(vector_cosine.min()),
+            "vector_cosine_mean": float(vector_cosine.mean()),
+            "score_abs_diff_max": float(np.abs(torch_scores - onnx_scores).max()),
+            "score_abs_diff_mean": float(np.abs(torch_scores - onnx_scores).mean()),
+            f"recall@{top_k}": recall,
+            "min_cosine": min_cosine,
+            "min_recall": min_recall,
+            "passed": passed,
+        },
+        "latency": {
+            "torch": {"query_ms": round(torch_latency, 2), "docs_per_sec": round(torch_throughput, 1)},
+            "onnx": {"query_ms": round(onnx_latency, 2), "docs_per_sec": round(onnx_throughput, 1)},
+            "query_speedup": round(torch_latency / max(onnx_latency, 1e-9), 2),
+            "throughput_speedup": round(onnx_throughput / max(torch_throughput, 1e-9), 2),
+        },
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
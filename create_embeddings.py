@@ -1,37 +1,254 @@
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from langchain_community.embeddings import HuggingFaceEmbeddings
-import os
 
-def create_sample_embeddings():
-    """샘플 데이터의 임베딩을 생성하는 함수"""
-    
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+
+from core.embedding_service import get_embedding_service  # noqa: E402
+from core.vector_index import append_to_saved_indexes, remove_saved_indexes  # noqa: E402
+
+# manifest에 기록되는 모델 식별자 (int8 ONNX 백엔드로 바꾸면 전체를 다시 임베딩)
+MODEL_NAME = get_embedding_service().namespace
+
+# 저장 형식별 dtype (float16은 float32 대비 절반 크기, 검색 시 청크 단위로 float32 변환)
+STORAGE_DTYPES = {
+    "float32": np.float32,
+    "float16": np.float16,
+}
+
+# 워커 프로세스마다 한 번만 로드되는 임베딩 모델
+_worker_model = None
+
+
+def load_embeddings_model():
+    """임베딩 모델을 로드하는 함수 (앱과 같은 embeddings 설정을 쓰는 공유 서비스)"""
+    return get_embedding_service()
+
+
+def _init_worker(threads_per_worker):
+    """워커 프로세스 초기화 - 코어를 나눠 쓰도록 스레드 수를 제한하고 모델 로드"""
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = load_embeddings_model()
+
+
+def _embed_batch(task):
+    """배치 하나를 임베딩하고 체크포인트 파일로 저장하는 함수"""
+    batch_id, texts, checkpoint_dir = task
+    vectors = np.asarray(_worker_model.embed_documents(texts), dtype=np.float32)
+    _save_checkpoint(Path(checkpoint_dir), batch_id, vectors)
+    return batch_id, len(texts)
+
+
+def _batch_path(checkpoint_dir, batch_id):
+    return checkpoint_dir / f"batch_{batch_id:06d}.npy"
+
+
+def _save_checkpoint(checkpoint_dir, batch_id, vectors):
+    # 중간에 중단되어도 깨진 파일이 남지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = checkpoint_dir / f"batch_{batch_id:06d}.tmp.npy"
+    np.save(tmp_path, vectors)
+    os.replace(tmp_path, _batch_path(checkpoint_dir, batch_id))
+
+
+def _prepare_checkpoint_dir(checkpoint_dir, texts, batch_size):
+    """입력/배치 크기가 같을 때만 이전 체크포인트를 재사용하는 함수"""
+    digest = hashlib.sha1()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    meta = {"input_sha1": digest.hexdigest(), "rows": len(texts), "batch_size": batch_size}
+
+    meta_path = checkpoint_dir / "meta.json"
+    if checkpoint_dir.exists():
+        try:
+            previous = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous = None
+        if previous != meta:
+            print("입력 데이터가 변경되어 이전 체크포인트를 삭제합니다.")
+            shutil.rmtree(checkpoint_dir)
+
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+
+def _print_progress(done_rows, total_rows, resumed_rows, start_time):
+    elapsed = max(time.time() - start_time, 1e-9)
+    rate = (done_rows - resumed_rows) / elapsed
+    eta = (total_rows - done_rows) / rate if rate > 0 else float("inf")
+    print(f"\r진행: {done_rows}/{total_rows}행 ({done_rows / max(total_rows, 1):.1%}) | "
+          f"{rate:.1f} rows/s | 남은 시간 {eta:.0f}s", end="", flush=True)
+
+
+def embed_texts(texts, batch_size=64, workers=1, checkpoint_dir="./data/.embeddings_checkpoint"):
+    """텍스트 목록을 배치 단위로 임베딩하는 함수
+
+    배치마다 체크포인트를 저장하므로 중단 후 다시 실행하면 남은 배치만 처리합니다.
+    workers > 1이면 프로세스마다 모델을 로드해 CPU 코어를 나눠 사용합니다.
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    _prepare_checkpoint_dir(checkpoint_dir, texts, batch_size)
+
+    batches = [(batch_id, texts[start:start + batch_size], str(checkpoint_dir))
+               for batch_id, start in enumerate(range(0, len(texts), batch_size))]
+    pending = [task for task in batches if not _batch_path(checkpoint_dir, task[0]).exists()]
+    resumed_rows = sum(len(task[1]) for task in batches) - sum(len(task[1]) for task in pending)
+
+    print(f"임베딩 생성 중... (총 {len(texts)}행, 배치 {batch_size}, 워커 {workers}, 재개 {resumed_rows}행)")
+
+    done_rows = resumed_rows
+    start_time = time.time()
+    if pending:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        if workers > 1:
+            with mp.get_context("spawn").Pool(workers, initializer=_init_worker,
+                                              initargs=(threads_per_worker,)) as pool:
+                for _, n_rows in pool.imap_unordered(_embed_batch, pending):
+                    done_rows += n_rows
+                    _print_progress(done_rows, len(texts), resumed_rows, start_time)
+        else:
+            _init_worker(threads_per_worker)
+            for task in pending:
+                _, n_rows = _embed_batch(task)
+                done_rows += n_rows
+                _print_progress(done_rows, len(texts), resumed_rows, start_time)
+        print()
+
+    # 배치 순서대로 합치기
+    embeddings_array = np.concatenate(
+        [np.load(_batch_path(checkpoint_dir, batch_id)) for batch_id, _, _ in batches]
+    )
+    shutil.rmtree(checkpoint_dir)
+
+    elapsed = time.time() - start_time
+    print(f"처리량: {(len(texts) - resumed_rows) / max(elapsed, 1e-9):.1f} rows/s ({elapsed:.1f}s)")
+    return embeddings_array
+
+
+def _row_hashes(texts):
+    return [hashlib.sha1(text.encode("utf-8")).hexdigest() for text in texts]
+
+
+def _manifest_path(output_npy):
+    output_path = Path(output_npy)
+    return output_path.with_name(f"{output_path.stem}.manifest.json")
+
+
+def _load_previous(output_npy):
+    """이전 실행의 (manifest, 임베딩(mmap))을 반환하는 함수 - 재사용할 수 없으면 None"""
+    manifest_path = _manifest_path(output_npy)
+    if not manifest_path.exists() or not Path(output_npy).exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        embeddings = np.load(output_npy, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if manifest.get("model") != MODEL_NAME or len(manifest.get("hashes", [])) != len(embeddings):
+        return None
+    return manifest, embeddings
+
+
+def create_sample_embeddings(input_csv="./data/text_ex.csv", output_npy="./data/embeddings_ex.npy",
+                             dtype="float32", batch_size=64, workers=1,
+                             checkpoint_dir="./data/.embeddings_checkpoint", full_rebuild=False):
+    """샘플 데이터의 임베딩을 생성하는 함수
+
+    행별 내용 해시를 manifest에 기록해 두고, 다시 실행하면 신규/수정된 행만 임베딩합니다.
+    삭제된 행은 제외되고, 행이 뒤에 추가되기만 한 경우 저장된 FAISS 인덱스도 새 벡터만 추가합니다.
+    """
+
     # 데이터 로드
-    text_df = pd.read_csv("./data/text_ex.csv")
-    
-    # 임베딩 모델 초기화 (main.py와 동일한 설정)
-    embeddings_model = HuggingFaceEmbeddings(
-        model_name="BAAI/bge-m3",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
+    text_df = pd.read_csv(input_csv)
+    texts = text_df['text'].fillna("").astype(str).tolist()
+    hashes = _row_hashes(texts)
+
+    previous = None if full_rebuild else _load_previous(output_npy)
+    previous_manifest, previous_embeddings = previous if previous else ({}, None)
+    previous_hashes = previous_manifest.get("hashes", [])
+    # 이전 manifest에 형식이 없으면 실제 저장된 배열의 dtype으로 판단
+    previous_dtype = previous_manifest.get("dtype", str(previous_embeddings.dtype)) if previous else None
+
+    previous_rows = defaultdict(list)
+    for row, row_hash in enumerate(previous_hashes):
+        previous_rows[row_hash].append(row)
+    reused = []
+    for row_hash in hashes:
+        rows = previous_rows.get(row_hash)
+        # 같은 내용의 행이 여러 개면 순서대로 대응시키고, 부족하면 마지막 행 벡터를 공유
+        reused.append((rows.pop(0) if len(rows) > 1 else rows[0]) if rows else None)
+    pending = [row for row, previous_row in enumerate(reused) if previous_row is None]
+    removed = len(previous_hashes) - len({row for row in reused if row is not None})
+
+    print(f"변경 사항: 유지 {len(texts) - len(pending)}행, 신규/수정 {len(pending)}행, 삭제 {removed}행")
+    unchanged_rows = previous is not None and not pending and reused == list(range(len(previous_hashes)))
+    if unchanged_rows and previous_manifest.get("model") == MODEL_NAME and previous_dtype == dtype:
+        print("변경된 행이 없어 임베딩을 그대로 유지합니다.")
+        return
+    if previous is not None and previous_dtype != dtype:
+        print(f"저장 형식 변경: {previous_dtype} -> {dtype} (유지되는 행은 이전 벡터를 변환해 다시 저장)")
+
+    new_embeddings = embed_texts([texts[row] for row in pending], batch_size, workers, checkpoint_dir) \
+        if pending else None
+
+    # 유지된 행은 이전 벡터를 복사하고, 신규/수정 행만 새 벡터로 채움
+    dimension = new_embeddings.shape[1] if new_embeddings is not None else previous_embeddings.shape[1]
+    embeddings_array = np.empty((len(texts), dimension), dtype=STORAGE_DTYPES[dtype])
+    kept = [row for row, previous_row in enumerate(reused) if previous_row is not None]
+    if kept:
+        embeddings_array[kept] = previous_embeddings[[reused[row] for row in kept]]
+    if pending:
+        embeddings_array[pending] = new_embeddings
+
+    # 형식만 바뀐 경우(pending 없음)는 추가가 아니므로 저장된 인덱스를 재빌드 대상으로 처리
+    appended_only = previous is not None and bool(pending) and previous_dtype == dtype \
+        and reused[:len(previous_hashes)] == list(range(len(previous_hashes))) \
+        and pending == list(range(len(previous_hashes), len(texts)))
+
+    # 유지된 행은 위에서 복사했으므로 mmap 참조를 모두 놓아 파일을 교체하기 전에 매핑을 해제
+    # (Windows에서는 매핑된 파일을 덮어쓸 수 없음)
+    previous = previous_embeddings = None
+
+    # 읽는 중인 프로세스가 깨진 파일을 보지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = Path(output_npy).with_suffix(".tmp.npy")
+    np.save(tmp_path, embeddings_array)
+    os.replace(tmp_path, output_npy)
+    _manifest_path(output_npy).write_text(
+        json.dumps({"model": MODEL_NAME, "dtype": dtype, "hashes": hashes}), encoding="utf-8"
     )
-    
-    print("임베딩 생성 중...")
-    
-    # 각 텍스트에 대해 임베딩 생성
-    embeddings_list = []
-    for text in text_df['text']:
-        embedding = embeddings_model.embed_query(text)
-        embeddings_list.append(embedding)
-    
-    # numpy 배열로 변환
-    embeddings_array = np.array(embeddings_list)
-    
-    # 저장
-    np.save("./data/embeddings_ex.npy", embeddings_array)
-    
-    print(f"임베딩 생성 완료! 형태: {embeddings_array.shape}")
-    print(f"저장 위치: ./data/embeddings_ex.npy")
+
+    # 저장된 벡터 인덱스 갱신: 추가만 있었다면 새 벡터만 추가, 아니면 다음 로드 시 재빌드
+    if appended_only:
+        append_to_saved_indexes(output_npy, new_embeddings)
+    else:
+        remove_saved_indexes(output_npy)
+
+    print(f"임베딩 생성 완료! 형태: {embeddings_array.shape}, 형식: {embeddings_array.dtype}")
+    print(f"저장 위치: {output_npy}")
 
 if __name__ == "__main__":
-    create_sample_embeddings() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="샘플 데이터 임베딩 생성")
+    parser.add_argument("--input", default="./data/text_ex.csv", help="text 컬럼이 있는 입력 CSV")
+    parser.add_argument("--output", default="./data/embeddings_ex.npy", help="저장할 임베딩 파일")
+    parser.add_argument("--dtype", choices=list(STORAGE_DTYPES), default="float32",
+                        help="임베딩 저장 형식 (int8/PQ 압축은 search.index_type=sq8/pq 인덱스로 제공)")
+    parser.add_argument("--batch-size", type=int, default=64, help="embed_documents 한 번에 넣을 행 수")
+    parser.add_argument("--workers", type=int, default=1, help="임베딩 프로세스 수 (프로세스마다 모델 로드)")
+    parser.add_argument("--checkpoint-dir", default="./data/.embeddings_checkpoint",
+                        help="배치별 체크포인트 저장 위치 (완료 시 삭제)")
+    parser.add_argument("--full", action="store_true", help="manifest를 무시하고 전체 행을 다시 임베딩")
+    args = parser.parse_args()
+    create_sample_embeddings(args.input, args.output, args.dtype, args.batch_size,
+                             args.workers, args.checkpoint_dir, args.full)
@@ -0,0 +1,112 @@
+"""
+압축 임베딩 인덱스의 재현율 리포트
+
+정확 검색(exact, float32) 결과를 기준으로 float16 저장, SQ8, PQ 인덱스의
+recall@k, 평균 지연시간, 벡터당 저장 크기를 비교해 JSON으로 출력합니다.
+
+사용법:
+    python evaluate_quantization.py --embeddings ./data/embeddings_ex.npy --top-k 10
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+
+from core.vector_index import create_index  # noqa: E402
+
+
+def recall_at_k(reference_ids, candidate_ids) -> float:
+    """기준 결과 대비 후보 결과의 평균 recall@k를 계산하는 함수"""
+    hits = [len(set(ref) & set(cand)) / max(len(ref), 1) for ref, cand in zip(reference_ids, candidate_ids)]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def make_queries(embeddings: np.ndarray, n_queries: int, noise: float, seed: int) -> np.ndarray:
+    """코퍼스 벡터에 잡음을 더해 질의 벡터를 만드는 함수 (모델 없이 재현 가능)"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    queries = np.asarray(embeddings[np.sort(rows)], dtype=np.float32)
+    queries += rng.normal(scale=noise, size=queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def run_index(index, queries: np.ndarray, top_k: int):
+    ids = []
+    start = time.perf_counter()
+    for query in queries:
+        _, indices = index.search(query.reshape(1, -1), top_k)
+        ids.append(indices.tolist())
+    latency_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+    return ids, latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="압축 인덱스 재현율 리포트")
+    parser.add_argument("--embeddings", default="./data/embeddings_ex.npy")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--pq-m", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embeddings = np.load(args.embeddings, mmap_mode="r")
+    dimension = embeddings.shape[1]
+    queries = make_queries(embeddings, args.queries, args.noise, args.seed)
+
+    reference = create_index("exact")
+    reference.build(np.asarray(embeddings, dtype=np.float32))
+    reference_ids, reference_latency = run_index(reference, queries, args.top_k)
+
+    configs = [
+        ("float16", "exact", {}, np.float16, 2 * dimension),
+        ("sq8", "sq8", {"rerank_factor": 1}, np.float32, dimension),
+        ("sq8+rerank", "sq8", {"rerank_factor": 4}, np.float32, dimension),
+        ("pq", "pq", {"rerank_factor": 1, "pq_m": args.pq_m}, np.float32, None),
+        ("pq+rerank", "pq", {"rerank_factor": 4, "pq_m": args.pq_m}, np.float32, None),
+    ]
+
+    report = {
+        "embeddings": args.embeddings,
+        "rows": len(embeddings),
+        "dimension": dimension,
+        "top_k": args.top_k,
+        "queries": len(queries),
+        "results": [{
+            "name": "exact(float32)",
+            "recall_at_k": 1.0,
+            "avg_latency_ms": round(reference_latency, 3),
+            "bytes_per_vector": 4 * dimension,
+            "compression": 1.0,
+        }],
+    }
+
+    for name, index_type, params, dtype, bytes_per_vector in configs:
+        index = create_index(index_type, params)
+        start = time.perf_counter()
+        index.build(np.asarray(embeddings, dtype=dtype))
+        build_seconds = time.perf_counter() - start
+        if bytes_per_vector is None:
+            bytes_per_vector = index.index.code_size
+
+        ids, latency_ms = run_index(index, queries, args.top_k)
+        report["results"].append({
+            "name": name,
+            "recall_at_k": round(recall_at_k(reference_ids, ids), 4),
+            "avg_latency_ms": round(latency_ms, 3),
+            "bytes_per_vector": int(bytes_per_vector),
+            "compression": round(4 * dimension / bytes_per_vector, 1),
+            "build_seconds": round(build_seconds, 3),
+        })
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+서빙 스택 부하 테스트
+
+JSONL 파일(한 줄에 요청 하나)의 질문을 FastAPI 서버의 /prompt, /chat(LangServe 스트리밍)과 /rag 엔드포인트로
+재생하고 처리량, 첫 토큰 지연(TTFT), 전체 지연시간 분위수를 JSON으로 출력합니다.
+GPU 없이 용량을 계획하려면 stub_ollama.py를 띄우고 서버의 Ollama 주소를 스텁으로 지정하세요.
+
+각 줄에서 question → prompt → body → title 순으로 질문 문장을 찾고, endpoint 키가 있으면 그 엔드포인트로 보냅니다
+(없으면 --endpoints를 순서대로 돌아가며 사용). requests.jsonl처럼 {"request_id", "title", "body"} 형식도 그대로 재생합니다.
+
+도착 방식:
+    --rate 0   (기본) 닫힌 루프: --concurrency개 작업자가 응답을 받는 즉시 다음 요청을 보냄
+    --rate R   열린 루프: 초당 R건 포아송 도착, 동시 요청은 --concurrency개로 제한
+
+사용법:
+    python stub_ollama.py --port 11435 --token-latency-ms 25 &
+    OLLAMA_BASE_URL=http://localhost:11435 python app/server.py &
+    python replay_load.py requests.jsonl --endpoints rag,prompt,chat --concurrency 16 --requests 200
+    python replay_load.py requests.jsonl --endpoints rag --rate 5 --duration 60 --output ./cache/loadtest.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+ENDPOINTS = ("rag", "prompt", "chat")
+
+
+def load_questions(path: str) -> List[Dict[str, Optional[str]]]:
+    """JSONL 파일에서 (질문, 엔드포인트) 목록을 읽는 함수"""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = next((record[key] for key in ("question", "prompt", "body", "title") if record.get(key)), None)
+            if question:
+                items.append({"question": str(question), "endpoint": record.get("endpoint")})
+    if not items:
+        raise ValueError(f"재생할 질문이 없습니다: {path}")
+    return items
+
+
+async def send_rag(client: httpx.AsyncClient, question: str, session_id: str, result: Dict):
+    """/rag NDJSON 스트림을 읽으며 첫 토큰 시각과 토큰 수를 기록하는 함수"""
+    payload = {"question": question, "stream": True, "session_id": session_id}
+    async with client.stream("POST", "/rag", json=payload) as response:
+        result["status"] = response.status_code
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["type"] == "token":
+                result.setdefault("ttft", time.perf_counter() - result["start"])
+                result["tokens"] += 1
+            elif event["type"] == "fallback":
+                result["outcome"] = "shed"
+            elif event["type"] == "error":
+                result["outcome"] = "error"
+
+
+async def send_langserve(client: httpx.AsyncClient, path: str, payload: Dict, result: Dict):
+    """LangServe /stream 엔드포인트의 SSE 스트림을 읽는 함수 (event: data 한 건이 토큰 한 개)"""
+    async with client.stream("POST", f"{path}/stream", json={"input": payload}) as response:
+        result["status"] = response.status_code
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                if event == "data" and json.loads(line[len("data:"):]):
+                    result.setdefault("ttft", time.perf_counter() - result["start"])
+                    result["tokens"] += 1
+                elif event == "error":
+                    result["outcome"] = "error"
+
+
+async def send_request(client: httpx.AsyncClient, endpoint: str, question: str, session_id: str,
+                       start: Optional[float] = None) -> Dict:
+    """요청 하나를 보내고 결과를 반환하는 함수 (start: 도착 시각, 지연시간과 TTFT의 기준)"""
+    start = time.perf_counter() if start is None else start
+    result = {"endpoint": endpoint, "start": start, "tokens": 0, "outcome": "ok", "status": None}
+    try:
+        if endpoint == "rag":
+            await send_rag(client, question, session_id, result)
+        elif endpoint == "prompt":
+            await send_langserve(client, "/prompt", {"user_prompt": question}, result)
+        else:
+            await send_langserve(client, "/chat", {"messages": [{"type": "human", "content": question}]}, result)
+    except httpx.HTTPStatusError:
+        # /rag는 대기열 초과 시 스트림 대신 503을 줄 수 있음
+        result["outcome"] = "shed" if result["status"] == 503 else "error"
+        result["error"] = f"HTTP {result['status']}"
+    except (httpx.HTTPError, ValueError) as e:
+        result["outcome"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["latency"] = time.perf_counter() - result["start"]
+    return result
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """초 단위 값 목록의 분위수를 ms로 반환하는 함수"""
+    if not values:
+        return {}
+    array = np.asarray(values) * 1000
+    return {
+        "mean": round(float(array.mean()), 1),
+        "p50": round(float(np.percentile(array, 50)), 1),
+        "p90": round(float(np.percentile(array, 90)), 1),
+        "p95": round(float(np.percentile(array, 95)), 1),
+        "p99": round(float(np.percentile(array, 99)), 1),
+        "max": round(float(array.max()), 1),
+    }
+
+
+def summarize(results: List[Dict], wall_seconds: float) -> Dict:
+    ok = [result for result in results if result["outcome"] == "ok"]
+    errors = [result for result in results if result["outcome"] == "error"]
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "shed": sum(result["outcome"] == "shed" for result in results),
+        "errors": len(errors),
+        "throughput_rps": round(len(ok) / max(wall_seconds, 1e-9), 2),
+        "tokens_per_sec": round(sum(result["tokens"] for result in ok) / max(wall_seconds, 1e-9), 1),
+        "ttft_ms": percentiles([result["ttft"] for result in ok if "ttft" in result]),
+        "latency_ms": percentiles([result["latency"] for result in ok]),
+        "sample_errors": sorted({result["error"] for result in errors if "error" in result})[:5],
+    }
+
+
+async def run(args) -> Dict:
+    questions = load_questions(args.input)
+    endpoints = itertools.cycle(args.endpoints)
+    schedule = itertools.cycle(questions)
+    random.seed(args.seed)
+
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    sent = itertools.count()
+
+    def next_request():
+        """남은 요청이 있으면 (엔드포인트, 질문, 세션 ID), 없으면 None"""
+        n = next(sent)
+        if (args.requests and n >= args.requests) or (deadline and time.perf_counter() >= deadline):
+            return None
+        item = next(schedule)
+        endpoint = item["endpoint"] if item["endpoint"] in ENDPOINTS else next(endpoints)
+        return endpoint, item["question"], f"loadtest-{n % args.sessions}"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+    results: List[Dict] = []
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        start = time.perf_counter()
+        if args.rate > 0:
+            # 열린 루프: 응답 속도와 무관하게 포아송 간격으로 요청 시작 (동시 요청 수만 제한)
+            slots = asyncio.Semaphore(args.concurrency)
+            tasks = []
+
+            async def limited(request):
+                # 동시 요청 상한으로 기다린 시간도 지연시간에 포함되도록 도착 시각을 기준으로 측정
+                arrived = time.perf_counter()
+                async with slots:
+                    results.append(await send_request(client, *request, start=arrived))
+
+            while (request := next_request()) is not None:
+                tasks.append(asyncio.create_task(limited(request)))
+                await asyncio.sleep(random.expovariate(args.rate))
+            await asyncio.gather(*tasks)
+        else:
+            # 닫힌 루프: 작업자마다 응답을 받으면 바로 다음 요청
+            async def worker():
+                while (request := next_request()) is not None:
+                    results.append(await send_request(client, *request))
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall_seconds = time.perf_counter() - start
+
+    return {
+        "url": args.url,
+        "input": args.input,
+        "concurrency": args.concurrency,
+        "arrival_rate": args.rate or "closed-loop",
+        "wall_seconds": round(wall_seconds, 2),
+        "overall": summarize(results, wall_seconds),
+        "endpoints": {
+            endpoint: summarize([result for result in results if result["endpoint"] == endpoint], wall_seconds)
+            for endpoint in ENDPOINTS if any(result["endpoint"] == endpoint for result in results)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL 요청 재생 부하 테스트 (처리량, TTFT, 꼬리 지연시간)")
+    parser.add_argument("input", nargs="?", default="./requests.jsonl", help="재생할 JSONL 파일")
+    parser.add_argument("--url", default="http://localhost:8000", help="FastAPI 서버 주소")
+    parser.add_argument("--endpoints", default="rag", help=f"쉼표로 구분한 엔드포인트 ({', '.join(ENDPOINTS)})")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수 (닫힌 루프 작업자 수 / 열린 루프 상한)")
+    parser.add_argument("--rate", type=float, default=0.0, help="초당 도착 요청 수 (0이면 닫힌 루프)")
+    parser.add_argument("--requests", type=int, default=100, help="보낼 요청 수 (0이면 --duration까지)")
+    parser.add_argument("--duration", type=float, default=0.0, help="최대 실행 시간 (초, 0이면 제한 없음)")
+    parser.add_argument("--sessions", type=int, default=8, help="요청에 나눠 붙일 세션 ID 수 (/rag 공정 분배)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="요청당 타임아웃 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON 리포트를 저장할 파일")
+    args = parser.parse_args()
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown or not args.endpoints:
+        parser.error(f"지원하지 않는 엔드포인트: {', '.join(sorted(unknown)) or '(없음)'}")
+    if not args.requests and not args.duration:
+        parser.error("--requests 또는 --duration 중 하나는 0보다 커야 합니다.")
+    args.concurrency = max(1, args.concurrency)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+부하 테스트용 Ollama 스텁 서버
+
+Ollama의 /api/generate, /api/chat 스트리밍(NDJSON) 응답 형식을 흉내 내며,
+첫 토큰 지연(프롬프트 처리 시간)과 토큰 간 지연을 설정해 GPU 없이 서빙 스택의 용량을 측정할 수 있게 합니다.
+--parallel로 동시에 생성하는 요청 수를 제한해 실제 Ollama(OLLAMA_NUM_PARALLEL)처럼 초과 요청은 대기합니다.
+
+사용법:
+    python stub_ollama.py --port 11435 --ttft-ms 300 --token-latency-ms 25 --tokens 128 --parallel 4
+    OLLAMA_BASE_URL=http://localhost:11435 python app/server.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+TOKENS = ["운동", "을 ", "할 ", "때는 ", "자세", "가 ", "중요", "합니다", ". ", "천천히 ", "반복", "하세요", "\n"]
+
+app = FastAPI()
+config = {}
+state = {"active": 0, "waiting": 0, "served": 0}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _delay(base_ms: float) -> float:
+    jitter = config["jitter"]
+    return max(base_ms * (1 + random.uniform(-jitter, jitter)), 0.0) / 1000
+
+
+async def generate_tokens(prompt: str, num_predict):
+    """설정된 지연으로 토큰을 하나씩 내보내는 비동기 제너레이터 (--parallel 슬롯 안에서 실행)"""
+    n_tokens = config["tokens"] if not num_predict or num_predict < 0 else min(config["tokens"], num_predict)
+    state["waiting"] += 1
+    async with config["slots"]:
+        state["waiting"] -= 1
+        state["active"] += 1
+        try:
+            # 프롬프트 처리(prefill) 시간은 프롬프트 길이에 비례하는 부분을 포함
+            await asyncio.sleep(_delay(config["ttft_ms"] + config["prefill_ms_per_1k_chars"] * len(prompt) / 1000))
+            for i in range(n_tokens):
+                if i:
+                    await asyncio.sleep(_delay(config["token_latency_ms"]))
+                yield TOKENS[i % len(TOKENS)]
+        finally:
+            state["active"] -= 1
+            state["served"] += 1
+
+
+def _final_chunk(model: str, started: float, n_tokens: int) -> dict:
+    duration_ns = int((time.perf_counter() - started) * 1e9)
+    return {"model": model, "created_at": _now(), "done": True, "done_reason": "stop",
+            "total_duration": duration_ns, "eval_count": n_tokens, "eval_duration": duration_ns}
+
+
+async def _respond(body: dict, prompt: str, make_chunk):
+    model = body.get("model", "stub")
+    num_predict = (body.get("options") or {}).get("num_predict")
+    started = time.perf_counter()
+
+    if not body.get("stream", True):
+        tokens = [token async for token in generate_tokens(prompt, num_predict)]
+        return {**make_chunk(model, "".join(tokens)), **_final_chunk(model, started, len(tokens))}
+
+    async def lines():
+        n_tokens = 0
+        async for token in generate_tokens(prompt, num_predict):
+            n_tokens += 1
+            yield json.dumps({**make_chunk(model, token), "done": False}, ensure_ascii=False) + "\n"
+        yield json.dumps({**make_chunk(model, ""), **_final_chunk(model, started, n_tokens)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/api/generate")
+async def api_generate(request: Request):
+    body = await request.json()
+    prompt = body.get("prompt") or ""
+    if not prompt:
+        # 빈 프롬프트는 모델 미리 로드 요청 (core.llm.preload_model)
+        return {"model": body.get("model", "stub"), "created_at": _now(), "response": "", "done": True}
+    return await _respond(body, prompt,
+                          lambda model, text: {"model": model, "created_at": _now(), "response": text})
+
+
+@app.post("/api/chat")
+async def api_chat(request: Request):
+    body = await request.json()
+    prompt = "".join(str(message.get("content", "")) for message in body.get("messages", []))
+    return await _respond(body, prompt, lambda model, text: {
+        "model": model, "created_at": _now(), "message": {"role": "assistant", "content": text},
+    })
+
+
+@app.get("/api/tags")
+async def api_tags():
+    return {"models": [{"name": config.get("model", "stub"), "model": config.get("model", "stub")}]}
+
+
+@app.get("/stats")
+async def stats():
+    """현재 생성 중/대기 중인 요청 수"""
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama 스트리밍 API 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="stub")
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="첫 토큰까지의 기본 지연")
+    parser.add_argument("--prefill-ms-per-1k-chars", type=float, default=20.0, help="프롬프트 1000자당 추가 첫 토큰 지연")
+    parser.add_argument("--token-latency-ms", type=float, default=25.0, help="토큰 간 지연")
+    parser.add_argument("--tokens", type=int, default=128, help="응답 토큰 수 (num_predict가 더 작으면 그 값)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="지연 변동 비율 (0.1 = ±10%%)")
+    parser.add_argument("--parallel", type=int, default=4, help="동시에 생성하는 요청 수 (초과 요청은 대기)")
+    args = parser.parse_args()
+
+    config.update(
+        model=args.model, ttft_ms=args.ttft_ms, prefill_ms_per_1k_chars=args.prefill_ms_per_1k_chars,
+        token_latency_ms=args.token_latency_ms, tokens=args.tokens, jitter=args.jitter,
+        slots=asyncio.Semaphore(max(1, args.parallel)),
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+임베딩 백엔드 일치도 테스트 (PyTorch vs ONNX Runtime fp32)
+
+같은 문장을 두 백엔드로 임베딩해 문장별 코사인 유사도와 질의별 검색 상위 k개 일치도를 확인합니다.
+onnxruntime/sentence-transformers가 없거나 embeddings.onnx_dir에 내보낸 모델이 없으면 건너뜁니다
+(모델 내보내기는 python compare_embedding_backends.py 첫 실행 시 수행).
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from config.settings import settings  # noqa: E402
+from core.embedding_service import create_embedding_service  # noqa: E402
+from core.onnx_embedder import FP32_FILENAME  # noqa: E402
+
+MIN_COSINE = 0.999
+TOP_K = 3
+
+QUERIES = [
+    "하체 근력을 키우는 운동 추천해줘",
+    "덤벨로 할 수 있는 어깨 운동",
+    "허리가 아플 때 피해야 할 자세",
+    "초보자를 위한 유연성 운동",
+]
+
+DOCUMENTS = [
+    "운동명: 스쿼트\n운동 부위: 하체\n도구: 정보 없음\n체력 요소: 근력",
+    "운동명: 덤벨 숄더 프레스\n운동 부위: 어깨\n도구: 덤벨\n체력 요소: 근력",
+    "운동명: 고양이-소 자세\n운동 부위: 허리\n도구: 매트\n체력 요소: 유연성",
+    "운동명: 햄스트링 스트레칭\n운동 부위: 다리\n도구: 정보 없음\n체력 요소: 유연성",
+    "운동명: 플랭크\n운동 부위: 복근/코어\n도구: 매트\n체력 요소: 근지구력",
+    "운동명: 런지\n운동 부위: 하체/엉덩이\n도구: 정보 없음\n체력 요소: 근력",
+]
+
+
+def _onnx_dir() -> Path:
+    onnx_dir = Path(settings.get("embeddings", "onnx_dir", "./models/bge-m3-onnx"))
+    return onnx_dir if onnx_dir.is_absolute() else ROOT / onnx_dir
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    onnx_dir = _onnx_dir()
+    if not (onnx_dir / FP32_FILENAME).exists():
+        pytest.skip(f"내보낸 ONNX 모델이 없습니다: {onnx_dir / FP32_FILENAME}")
+
+    torch_service = create_embedding_service("torch")
+    onnx_service = create_embedding_service("onnx")
+    onnx_service.onnx_dir = str(onnx_dir)
+    onnx_service.onnx_quantize = False
+
+    result = {}
+    for name, service in (("torch", torch_service), ("onnx", onnx_service)):
+        result[name] = (
+            np.asarray(service.embed_documents(DOCUMENTS), dtype=np.float32),
+            np.asarray([service.embed_query(query) for query in QUERIES], dtype=np.float32),
+        )
+    return result
+
+
+def test_vectors_match_per_text(vectors):
+    torch_docs, torch_queries = vectors["torch"]
+    onnx_docs, onnx_queries = vectors["onnx"]
+    # 두 백엔드 모두 정규화된 벡터를 반환하므로 내적이 코사인 유사도
+    cosine = np.concatenate([
+        np.sum(torch_docs * onnx_docs, axis=1),
+        np.sum(torch_queries * onnx_queries, axis=1),
+    ])
+    assert cosine.min() >= MIN_COSINE, f"코사인 최솟값 {cosine.min():.5f} < {MIN_COSINE}"
+
+
+def test_top_k_results_agree(vectors):
+    torch_docs, torch_queries = vectors["torch"]
+    onnx_docs, onnx_queries = vectors["onnx"]
+    torch_top = np.argsort(-(torch_queries @ torch_docs.T), axis=1)[:, :TOP_K]
+    onnx_top = np.argsort(-(onnx_queries @ onnx_docs.T), axis=1)[:, :TOP_K]
+    for query, expected, actual in zip(QUERIES, torch_top, onnx_top):
+        assert set(expected) == set(actual), f"{query}: {expected.tolist()} != {actual.tolist()}"
+        assert expected[0] == actual[0]
@@ -0,0 +1,53 @@
+"""
+LLM 스케줄러 request_timeout 테스트
+
+슬롯을 request_timeout보다 오래 잡은 요청은 슬롯이 회수되어 대기 중인 요청이 실행되고,
+회수된 티켓은 expired로 표시되는지 확인합니다.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from core.llm_scheduler import LLMScheduler  # noqa: E402
+
+
+def test_stalled_request_releases_slot_after_request_timeout():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue_size=5, queue_timeout=5.0, request_timeout=0.2)
+    holder_started = threading.Event()
+    expired = []
+
+    def stalled():
+        with scheduler.slot("stalled") as ticket:
+            holder_started.set()
+            time.sleep(0.6)
+            expired.append(ticket.expired)
+
+    holder = threading.Thread(target=stalled)
+    holder.start()
+    holder_started.wait()
+
+    start = time.monotonic()
+    with scheduler.slot("waiting") as ticket:
+        waited = time.monotonic() - start
+        assert not ticket.expired
+    holder.join()
+
+    assert waited < 0.5
+    assert expired == [True]
+    stats = scheduler.get_stats()
+    assert stats["request_timeouts"] == 1
+    assert stats["completed"] == 1
+    assert stats["active"] == 0
+
+
+def test_released_slot_is_not_expired():
+    scheduler = LLMScheduler(max_concurrent=1, request_timeout=0.1)
+    with scheduler.slot() as ticket:
+        pass
+    time.sleep(0.2)
+    assert not ticket.expired
+    assert scheduler.get_stats()["request_timeouts"] == 0
@@ -0,0 +1,68 @@
+"""
+벡터 인덱스 테스트
+
+- 메타데이터 필터 검색(search_subset): 모든 인덱스 타입에서 후보가 적을 때(원본 벡터 직접 계산)와
+  많을 때(FAISS 검색) 모두 오류 없이 후보 행만 반환하는지 확인합니다.
+- 저장된 인덱스 재사용: 빌드 파라미터가 바뀌면 다시 빌드하는지 확인합니다.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from core.vector_index import INDEX_TYPES, create_index, get_index_path, load_or_build_index  # noqa: E402
+
+N_ROWS = 3000
+DIMENSION = 64
+
+
+@pytest.fixture(scope="module")
+def embeddings():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((N_ROWS, DIMENSION)).astype(np.float32)
+
+
+@pytest.mark.parametrize("index_type", list(INDEX_TYPES))
+@pytest.mark.parametrize("filter_exact_max", [50000, 10])
+@pytest.mark.parametrize("attached", [True, False])
+def test_search_subset_returns_only_candidates(embeddings, index_type, filter_exact_max, attached):
+    index = create_index(index_type, {"filter_exact_max": filter_exact_max, "pq_m": 16, "ivf_nlist": 16})
+    index.build(embeddings)
+    if not attached and index_type != "exact":
+        # 저장된 인덱스만 로드하고 원본 임베딩을 연결하지 않은 경우
+        index.embeddings = None
+
+    candidate_ids = np.arange(0, N_ROWS, 3)
+    query_row = 300
+    scores, indices = index.search_subset(embeddings[query_row], candidate_ids, 5)
+
+    assert len(indices) == 5
+    assert np.isin(indices, candidate_ids).all()
+    assert np.all(np.diff(scores) <= 1e-6)
+    if index_type != "pq" or attached:
+        assert indices[0] == query_row
+
+
+@pytest.mark.parametrize("index_type, params, changed", [
+    ("ivf", {"ivf_nlist": 8}, {"ivf_nlist": 16}),
+    ("hnsw", {"hnsw_m": 16}, {"hnsw_m": 8}),
+    ("pq", {"pq_m": 16}, {"pq_m": 8}),
+])
+def test_saved_index_is_rebuilt_when_build_params_change(tmp_path, embeddings, index_type, params, changed):
+    npy_path = tmp_path / "embeddings.npy"
+    np.save(npy_path, embeddings)
+    index_path = get_index_path(str(npy_path), index_type)
+
+    load_or_build_index(embeddings, str(npy_path), index_type, params)
+    saved_at = index_path.stat().st_mtime_ns
+
+    load_or_build_index(embeddings, str(npy_path), index_type, params)
+    assert index_path.stat().st_mtime_ns == saved_at
+
+    index = load_or_build_index(embeddings, str(npy_path), index_type, changed)
+    assert index_path.stat().st_mtime_ns != saved_at
+    assert index.build_params() == {**index.build_params(), **changed}